@@ -0,0 +1,75 @@
+"""
+Benchmark of the `TokenBalance` conversions and attribution checks against the previous string slicing and
+`Decimal` based implementation.
+"""
+
+import argparse
+import os
+import timeit
+from decimal import Decimal
+
+from encrypticoin_ssi import balance
+from encrypticoin_ssi.balance import TokenBalance, attribution_flags
+
+
+class LegacyTokenBalance:
+    __slots__ = ("address", "balance", "decimals")
+
+    def __init__(self, address: str, balance: str, decimals: int):
+        self.address = address
+        self.balance = balance
+        self.decimals = decimals
+
+    def has_attribution(self) -> bool:
+        return bool(self.as_integer())
+
+    def as_integer(self) -> int:
+        tmp = self.balance[: -self.decimals]
+        if tmp:
+            return int(tmp)
+        return 0
+
+    def as_float(self) -> float:
+        return float(Decimal(self.balance) / 10**self.decimals)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    values = [str(int.from_bytes(os.urandom(os.urandom(1)[0] % 12 + 1), "big")) for _ in range(args.count)]
+
+    def bench(name: str, func):
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print("%-36s %8.1f ns/balance" % (name, best / args.count * 1e9))
+
+    for cls in (LegacyTokenBalance, TokenBalance):
+        objects = [cls("addr", v, 18) for v in values]
+        bench("%s construction" % cls.__name__, lambda: [cls("addr", v, 18) for v in values])
+        bench(
+            "%s has_attribution x3" % cls.__name__,
+            lambda: [(b.has_attribution(), b.has_attribution(), b.has_attribution()) for b in objects],
+        )
+        bench("%s as_integer" % cls.__name__, lambda: [b.as_integer() for b in objects])
+        bench("%s as_float" % cls.__name__, lambda: [b.as_float() for b in objects])
+
+    legacy = [LegacyTokenBalance("addr", v, 18) for v in values]
+    bench("legacy has_attribution loop", lambda: [b.has_attribution() for b in legacy])
+
+    # The batches are evaluated on fresh objects, the balances are not parsed yet.
+    numpy = balance.numpy
+    for use_numpy in (True, False) if numpy is not None else (False,):
+        batches = iter([[TokenBalance("addr", v, 18) for v in values] for _ in range(args.repeat)])
+        balance.numpy = numpy if use_numpy else None
+        try:
+            bench(
+                "attribution_flags (%s)" % ("numpy" if use_numpy else "python"),
+                lambda: attribution_flags(next(batches)),
+            )
+        finally:
+            balance.numpy = numpy
+
+
+if __name__ == "__main__":
+    main()
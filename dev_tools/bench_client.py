@@ -0,0 +1,201 @@
+"""
+Benchmark suite of the `ServerIntegrationClient` methods and the collector catch-up, against the in-process
+`StandInTIA` on loopback, and of the `TokenBalance` conversions. The client and the server share the event loop, so
+the numbers are for comparing runs (e.g. before and after a change) on the same machine, not absolute capacities.
+
+    python -m dev_tools.bench_client --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from typing import Any, Awaitable, Callable, Dict, List
+
+import aiohttp
+from aiohttp.test_utils import TestServer
+
+from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi.collector import TokenChangeCollector
+from encrypticoin_ssi.snapshot_log import SnapshotLogStorage
+from encrypticoin_ssi.standin import StandInTIA
+
+try:
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+except ImportError:
+    Account = None
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _measure(call: Callable[[], Awaitable[Any]], requests: int, concurrency: int) -> Dict[str, float]:
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+async def bench_methods(client: ServerIntegrationClient, tia: StandInTIA, args) -> List[Dict[str, Any]]:
+    address = tia.wallet_address(0)
+    since = max(0, tia.changes - tia.page_size)
+    methods = {
+        "contract_info": client.contract_info,
+        "token_balance": lambda: client.token_balance(address),
+        "token_changes": lambda: client.token_changes(since, tia.session),
+        "token_changes_batch": lambda: client.token_changes_batch(since, tia.session),
+    }
+
+    async def iter_token_changes():
+        async for _ in client.iter_token_changes(since, tia.session):
+            pass
+
+    methods["iter_token_changes"] = iter_token_changes
+    if Account is not None:
+        wallet = Account.create()
+        signature = wallet.sign_message(encode_defunct(text="benchmark")).signature.hex()
+        methods["wallet_by_signed"] = lambda: client.wallet_by_signed("benchmark", signature)
+    tia.balance(address)  # Index the balances before the measurement.
+    results = []
+    for name, call in methods.items():
+        for concurrency in args.concurrency:
+            await _measure(call, min(args.requests, 20), concurrency)  # warm-up
+            result = await _measure(call, args.requests, concurrency)
+            result.update(method=name, concurrency=concurrency)
+            results.append(result)
+            print(
+                "%-22s c=%-4d %9.1f req/s  p50 %7.2f ms  p99 %7.2f ms"
+                % (name, concurrency, result["requests_per_second"], result["p50_ms"], result["p99_ms"])
+            )
+    return results
+
+
+async def bench_catch_up(client: ServerIntegrationClient, tia: StandInTIA) -> Dict[str, Any]:
+    results = {}
+    started = time.perf_counter()
+    since = 0
+    while True:
+        changes = await client.token_changes(since, tia.session)
+        if not changes:
+            break
+        since = changes[-1].id + 1
+    results["token_changes_per_second"] = tia.changes / (time.perf_counter() - started)
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SnapshotLogStorage(directory)
+        collector = TokenChangeCollector(client, storage)
+        started = time.perf_counter()
+        while await collector.collect():
+            pass
+        results["collector_changes_per_second"] = tia.changes / (time.perf_counter() - started)
+        storage.close()
+    print("catch-up %(token_changes_per_second)12.1f changes/s (client)" % results)
+    print("catch-up %(collector_changes_per_second)12.1f changes/s (collector)" % results)
+    return results
+
+
+def bench_balance(count: int, repeat: int) -> Dict[str, float]:
+    values = [str(int.from_bytes(os.urandom(os.urandom(1)[0] % 12 + 1), "big")) for _ in range(count)]
+    objects = [TokenBalance("addr", v, 18) for v in values]
+    results = {}
+    for name, func in (
+        ("construction", lambda: [TokenBalance("addr", v, 18) for v in values]),
+        ("as_integer", lambda: [TokenBalance("addr", v, 18).as_integer() for v in values]),
+        ("as_float", lambda: [TokenBalance("addr", v, 18).as_float() for v in values]),
+        ("has_attribution", lambda: [TokenBalance("addr", v, 18).has_attribution() for v in values]),
+        ("has_attribution_cached", lambda: [b.has_attribution() for b in objects]),
+    ):
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        results[name + "_ns"] = best / count * 1e9
+        print("TokenBalance %-24s %8.1f ns/balance" % (name, results[name + "_ns"]))
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]):
+    """
+    Print the relative changes against the results of a previous run.
+    """
+    previous = {(r["method"], r["concurrency"]): r for r in baseline["methods"]}
+    for result in results["methods"]:
+        old = previous.get((result["method"], result["concurrency"]))
+        if old is not None:
+            change = result["requests_per_second"] / old["requests_per_second"] - 1
+            print("%-22s c=%-4d %+7.1f%% req/s" % (result["method"], result["concurrency"], change * 100))
+    for name, value in results["catch_up"].items():
+        if name in baseline["catch_up"]:
+            print("%-29s %+7.1f%%" % (name, (value / baseline["catch_up"][name] - 1) * 100))
+    for name, value in results["token_balance"].items():
+        if name in baseline["token_balance"]:
+            print("TokenBalance %-26s %+7.1f%% time" % (name, (value / baseline["token_balance"][name] - 1) * 100))
+
+
+async def run(args) -> Dict[str, Any]:
+    tia = StandInTIA(changes=args.changes, wallets=args.wallets, page_size=args.page_size)
+    server = TestServer(tia.create_app())
+    await server.start_server()
+    client = ServerIntegrationClient(domain="%s:%d" % (server.host, server.port), scheme="http")
+    await client.setup()
+    try:
+        return {
+            "methods": await bench_methods(client, tia, args),
+            "catch_up": await bench_catch_up(client, tia),
+        }
+    finally:
+        await client.close()
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000, help="requests per method and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--changes", type=int, default=100000, help="length of the change stream to catch up")
+    parser.add_argument("--wallets", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--balances", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="path of the JSON results")
+    parser.add_argument("--compare", help="path of the JSON results of a previous run")
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    results["token_balance"] = bench_balance(args.balances, args.repeat)
+    results["environment"] = {
+        "python": sys.version,
+        "platform": platform.platform(),
+        "aiohttp": aiohttp.__version__,
+        "arguments": vars(args),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Micro-benchmark of the available JSON codecs on realistic `/token-changes` pages.
+"""
+
+import argparse
+import os
+import timeit
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.codec import ORJSON_CODEC, STDLIB_CODEC
+
+
+def create_page(size: int) -> dict:
+    changes = []
+    for i in range(size):
+        balance = str(int.from_bytes(os.urandom(10), "big"))
+        changes.append({"id": 1000000 + i, "address": "0x" + os.urandom(20).hex(), "balance": balance})
+    return {"session": 1663000000, "decimals": 18, "changes": changes}
+
+
+def decode_page(codec, body: bytes):
+    result = codec.loads(body)
+    decimals = int(result["decimals"])
+    return [TokenBalanceChange(c["id"], c["address"], c["balance"], decimals) for c in result["changes"]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    codecs = [c for c in (STDLIB_CODEC, ORJSON_CODEC) if c is not None]
+    for size in args.page_sizes:
+        page = create_page(size)
+        body = STDLIB_CODEC.dumps(page)
+        number = max(1, 100000 // size)
+        print("page size: %d changes, %d bytes" % (size, len(body)))
+        for codec in codecs:
+            results = {
+                "loads": timeit.repeat(lambda: codec.loads(body), number=number, repeat=args.repeat),
+                "dumps": timeit.repeat(lambda: codec.dumps(page), number=number, repeat=args.repeat),
+                "page": timeit.repeat(lambda: decode_page(codec, body), number=number, repeat=args.repeat),
+            }
+            print(
+                "  %-8s" % codec.name
+                + "".join("  %s: %8.1f us" % (k, min(v) / number * 1e6) for k, v in results.items())
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Throughput of the batch signature verification with increasing number of worker processes.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi.recovery import LocalSignatureRecovery
+
+
+def create_pairs(count: int):
+    wallet = Account.create()
+    pairs = []
+    for i in range(count):
+        message = "Wallet ownership proof for token attribution at Benchmark web-shop.\nId: %d-%s" % (
+            i,
+            os.urandom(16).hex(),
+        )
+        pairs.append((message, wallet.sign_message(encode_defunct(text=message)).signature.hex()))
+    return pairs
+
+
+async def measure(pairs, workers: int, chunk_size: int) -> float:
+    with ProcessPoolExecutor(workers) as executor:
+        tia = ServerIntegrationClient(
+            signature_recovery=LocalSignatureRecovery(executor=executor, chunk_size=chunk_size)
+        )
+        await tia.verify_many(pairs[: workers * chunk_size])  # warm up the worker processes
+        tia.signature_recovery.cache.clear()
+        start = time.perf_counter()
+        results = await tia.verify_many(pairs)
+        elapsed = time.perf_counter() - start
+    assert all(isinstance(r, str) for r in results)
+    return len(pairs) / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=4000)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    pairs = create_pairs(args.count)
+    workers = 1
+    while workers <= args.max_workers:
+        print("workers: %2d  %8.0f verifications/s" % (workers, await measure(pairs, workers, args.chunk_size)))
+        workers *= 2
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""
+Memory usage of the `WalletBalanceIndex` compared to a dict of `TokenBalanceChange` objects (as in the tracking
+example). The 10M wallets case of the dict approach needs several gigabytes of memory.
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.wallet_index import WalletBalanceIndex
+
+
+def generate(count: int):
+    for i in range(count):
+        yield i, "0x" + os.urandom(20).hex(), str(int.from_bytes(os.urandom(10), "big"))
+
+
+def build_dict(count: int):
+    wallet_balances = {}
+    for i, address, balance in generate(count):
+        wallet_balances[address] = TokenBalanceChange(i, address, balance, 18)
+    return wallet_balances
+
+
+def build_index(count: int):
+    index = WalletBalanceIndex(18)
+    for i, address, balance in generate(count):
+        index.set(address, int(balance))
+    return index
+
+
+def measure(build, count: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(count)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000000, 10000000])
+    args = parser.parse_args()
+    for count in args.counts:
+        for name, build in (("dict", build_dict), ("index", build_index)):
+            size, elapsed = measure(build, count)
+            print(
+                "%9d wallets  %-5s  %8.1f MiB  %6.1f bytes/wallet  (built in %.1f s)"
+                % (count, name, size / 2**20, size / count, elapsed)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+End-to-end load generator of the example service-server workflows (`simple` or `tracking`). Virtual users go through
+the steps of `test_workflow.py` with the `ServiceClientMock`s: buy without attribution, challenge, signing with
+`eth_account`, signature submission and buy with attribution.
+
+    ALLOW_TESTS_IMPORT=1 python -m dev_tools.load_workflow --app tracking --spawn --users 2000 --levels 1 4 16 64 256
+
+With `--spawn`, the example server and a `encrypticoin_ssi.standin` API server are started as subprocesses, so the
+load test is offline. Otherwise the service-server at `--base-url` is used.
+
+The load is ramped through the concurrency `levels` (active users). Per-step latency histograms are reported for each
+level, and the costs of the server-side parts are estimated by subtraction of the step latencies (medians):
+    - session middleware and request handling: the anonymous buy
+    - signature handling: the submission minus the anonymous buy
+    - attribution lookup: the buy with a wallet minus the anonymous buy
+The throughput is saturated at the first level where adding users does not increase it by `--saturation` anymore.
+The wallets are created and the challenges signed in a pool of `--sign-workers` processes, so the CPU cost of the
+signing does not load the event loop of the generator. The CPU utilization of the generator's own process is
+reported for each level: when it is close to 100%, the results measure the generator instead of the server.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import aiohttp
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from encrypticoin_ssi.metrics import Histogram
+from encrypticoin_ssi_tests.simple.service_client import SimpleServiceClientMock
+
+STEPS = ("buy_anonymous", "challenge", "sign", "submit", "buy")
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class StepStats:
+    __slots__ = ("latencies", "errors")
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def histogram(self) -> Histogram:
+        histogram = Histogram(BUCKETS)
+        for latency in self.latencies:
+            histogram.observe(latency)
+        return histogram
+
+
+def sign_challenge(message: str) -> str:
+    """
+    Sign the challenge with a new wallet, in a worker process.
+    """
+    return Account.create().sign_message(encode_defunct(message.encode("utf-8"))).signature.hex()
+
+
+async def user_flow(base_url: str, stats: Dict[str, StepStats], executor: Executor):
+    client = SimpleServiceClientMock(base_url)
+    loop = asyncio.get_running_loop()
+    step = None
+    try:
+        step = "buy_anonymous"
+        started = time.perf_counter()
+        await client.buy("thing-a")
+        stats[step].latencies.append(time.perf_counter() - started)
+
+        step = "challenge"
+        started = time.perf_counter()
+        message = await client.wallet_challenge()
+        stats[step].latencies.append(time.perf_counter() - started)
+
+        step = "sign"
+        started = time.perf_counter()
+        signature = await loop.run_in_executor(executor, sign_challenge, message)
+        stats[step].latencies.append(time.perf_counter() - started)
+
+        step = "submit"
+        started = time.perf_counter()
+        await client.submit_signature(signature)
+        stats[step].latencies.append(time.perf_counter() - started)
+
+        step = "buy"
+        started = time.perf_counter()
+        await client.buy("thing-b")
+        stats[step].latencies.append(time.perf_counter() - started)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        stats[step].errors += 1
+        return False
+    finally:
+        await client.close()
+    return True
+
+
+async def run_level(base_url: str, users: int, concurrency: int, executor: Executor) -> dict:
+    stats = {step: StepStats() for step in STEPS}
+    remaining = iter(range(users))
+    completed = 0
+
+    async def worker():
+        nonlocal completed
+        for _ in remaining:
+            if await user_flow(base_url, stats, executor):
+                completed += 1
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "flows_per_second": completed / elapsed,
+        "generator_cpu": (time.process_time() - cpu_started) / elapsed,
+        "stats": stats,
+    }
+
+
+def report(level: dict):
+    print("\n== concurrency %(concurrency)d: %(flows_per_second).1f flows/s" % level)
+    print("generator CPU %.0f%%" % (level["generator_cpu"] * 100))
+    if level["generator_cpu"] > 0.9:
+        print("WARNING: the generator is CPU bound, the results are limited by it, use fewer users per generator")
+    stats = level["stats"]
+    for step in STEPS:
+        step_stats = stats[step]
+        if not step_stats.latencies:
+            print("%-14s no samples, %d errors" % (step, step_stats.errors))
+            continue
+        print(
+            "%-14s p50 %8.2f ms  p99 %8.2f ms  errors %d"
+            % (step, step_stats.percentile(0.5) * 1000, step_stats.percentile(0.99) * 1000, step_stats.errors)
+        )
+        histogram = step_stats.histogram()
+        print("%14s %s" % ("", "  ".join("<=%s:%d" % (bound, count) for bound, count in histogram.cumulative())))
+    baseline = stats["buy_anonymous"].percentile(0.5)
+    if baseline is not None and stats["submit"].latencies and stats["buy"].latencies:
+        print("estimated cost: session middleware and handling %.2f ms" % (baseline * 1000))
+        print("estimated cost: signature handling %.2f ms" % ((stats["submit"].percentile(0.5) - baseline) * 1000))
+        print("estimated cost: attribution lookup %.2f ms" % ((stats["buy"].percentile(0.5) - baseline) * 1000))
+        print("client cost: signing %.2f ms" % (stats["sign"].percentile(0.5) * 1000))
+
+
+async def wait_ready(base_url: str, standin_port: Optional[int] = None, timeout: float = 30.0):
+    """
+    Wait for the service-server, and the spawned stand-in API server that it calls for the signature submissions.
+    """
+    deadline = time.monotonic() + timeout
+    client = SimpleServiceClientMock(base_url)
+    try:
+        while True:
+            try:
+                await client.buy("ready")
+                if standin_port is not None:
+                    url = "http://127.0.0.1:%d/tia/contract-info" % standin_port
+                    async with client.session.get(url) as r:
+                        r.raise_for_status()
+                return
+            except aiohttp.ClientError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+    finally:
+        await client.close()
+
+
+async def ramp(args, executor: Executor) -> Optional[int]:
+    await wait_ready(args.base_url, args.standin_port if args.spawn else None)
+    # The worker processes are started before the measurement.
+    await asyncio.gather(
+        *(
+            asyncio.get_running_loop().run_in_executor(executor, sign_challenge, "warm-up")
+            for _ in range(args.sign_workers)
+        )
+    )
+    previous = None
+    for concurrency in args.levels:
+        level = await run_level(args.base_url, args.users, concurrency, executor)
+        report(level)
+        if previous is not None and level["flows_per_second"] < previous["flows_per_second"] * (1 + args.saturation):
+            print(
+                "\nthroughput saturated at concurrency %d (%.1f flows/s)"
+                % (previous["concurrency"], previous["flows_per_second"])
+            )
+            return previous["concurrency"]
+        previous = level
+    print("\nthroughput not saturated up to concurrency %d" % args.levels[-1])
+    return None
+
+
+def spawn(args) -> List[subprocess.Popen]:
+    standin = subprocess.Popen(
+        [sys.executable, "-m", "encrypticoin_ssi.standin", "--port", str(args.standin_port)]
+        + (["--latency-median", str(args.standin_latency)] if args.standin_latency else [])
+    )
+    env = dict(os.environ, TIA_DOMAIN="127.0.0.1:%d" % args.standin_port, TIA_SCHEME="http")
+    server = subprocess.Popen([sys.executable, "-m", "encrypticoin_ssi_tests.%s.service_server" % args.app], env=env)
+    return [server, standin]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", choices=("simple", "tracking"), default="simple")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start the example server with a stand-in API server")
+    parser.add_argument("--standin-port", type=int, default=8081)
+    parser.add_argument("--standin-latency", type=float, default=0.0, help="median latency of the stand-in (s)")
+    parser.add_argument("--users", type=int, default=1000, help="number of user flows per concurrency level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64, 256, 1024])
+    parser.add_argument("--saturation", type=float, default=0.1, help="minimum relative throughput gain")
+    parser.add_argument("--sign-workers", type=int, default=os.cpu_count(), help="processes for signing")
+    args = parser.parse_args()
+    processes = spawn(args) if args.spawn else []
+    try:
+        with ProcessPoolExecutor(args.sign_workers) as executor:
+            asyncio.run(ramp(args, executor))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,113 @@
+import re
 from decimal import Decimal
+from typing import List, Optional, Sequence
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class _Scales(dict):
+    """
+    The powers of ten by `decimals`, computing them would dominate the cost of the conversions.
+    """
+
+    __slots__ = ()
+
+    def __missing__(self, decimals: int) -> int:
+        scale = self[decimals] = 10**decimals
+        return scale
+
+
+_SCALES = _Scales()
+
+_CANONICAL = re.compile(r"(?:0|[1-9][0-9]*)\Z").match
 
 
 class TokenBalance:
-    __slots__ = ("address", "balance", "decimals")
+    __slots__ = ("address", "_balance", "decimals", "_value")
 
     def __init__(self, address: str, balance: str, decimals: int):
         self.address = address
-        self.balance = balance
+        self._balance = balance
         self.decimals = decimals
+        self._value = None
 
-    def has_attribution(self) -> bool:
+    @property
+    def balance(self) -> str:
+        """
+        Balance of the token in base units, as a decimal string.
+        """
+        return self._balance
+
+    @balance.setter
+    def balance(self, balance: str):
+        self._balance = balance
+        self._value = None
+
+    def as_base_units(self) -> int:
+        """
+        Balance of the token in base units. The parsed value is cached.
+        """
+        value = self._value
+        if value is None:
+            value = self._value = int(self._balance)
+        return value
+
+    def has_attribution(self, threshold: Optional[int] = None) -> bool:
         """
         Whether the wallet has enough tokens for attribution or not.
+        The `threshold` is the minimum balance in base units, one "whole" token by default.
         """
-        return bool(self.as_integer())
+        if threshold is None:
+            threshold = _SCALES[self.decimals]
+        return self.as_base_units() >= threshold
 
     def as_integer(self) -> int:
         """
         Balance of "whole" tokens.
         """
-        tmp = self.balance[: -self.decimals]
-        if tmp:
-            return int(tmp)
-        return 0
+        return self.as_base_units() // _SCALES[self.decimals]
 
     def as_float(self) -> float:
         """
         Limited precision balance of the token.
         """
-        return float(self.as_decimal())
+        return self.as_base_units() / _SCALES[self.decimals]
 
     def as_decimal(self) -> Decimal:
         """
         Exact precision balance of the token.
         """
-        return Decimal(self.balance) / 10**self.decimals
+        return Decimal(self.balance) / _SCALES[self.decimals]
+
+
+def attribution_flags(balances: Sequence[TokenBalance], threshold: Optional[int] = None) -> List[bool]:
+    """
+    Evaluate `has_attribution` for a sequence of balances in one pass.
+    Without a `threshold` the balances must have the same decimals. If NumPy is installed, large sequences are
+    evaluated by comparing the lengths of the canonical decimal strings, so these do not need to be parsed.
+    """
+    if not balances:
+        return []
+    if threshold is None:
+        decimals = balances[0].decimals
+        if any(b.decimals != decimals for b in balances):
+            raise ValueError("The balances have different decimals")
+        threshold = _SCALES[decimals]
+    if numpy is None or len(balances) < 64 or threshold <= 0:
+        return [b.as_base_units() >= threshold for b in balances]
+    strings = [b._balance for b in balances]
+    count = len(strings)
+    limit = str(threshold)
+    lengths = numpy.fromiter(map(len, strings), dtype=numpy.intp, count=count)
+    flags = lengths > len(limit)
+    # Equal length decimal strings compare the same way as their values.
+    for index in numpy.flatnonzero(lengths == len(limit)):
+        flags[index] = strings[index] >= limit
+    # Other than canonical non-negative integers (e.g. signed or zero-padded) are evaluated by value.
+    canonical = numpy.fromiter(map(_CANONICAL, strings), dtype=bool, count=count)
+    for index in numpy.flatnonzero(~canonical):
+        flags[index] = balances[index].as_base_units() >= threshold
+    return flags.tolist()
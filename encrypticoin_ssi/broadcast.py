@@ -0,0 +1,240 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.collector import ChangeListener
+
+
+class SessionReset:
+    """
+    Item delivered to the subscribers when the tracking session was reset, the items after it are from the replay of
+    the new session.
+    """
+
+    __slots__ = ("session",)
+
+    address = None
+
+    def __init__(self, session: int):
+        self.session = session
+
+
+class Subscription:
+    """
+    Bounded queue of the items published to a subscriber, iterate it asynchronously (or use `get`) to receive them.
+    When the queue is full, the `overflow` policy applies:
+        - `BLOCK`: The publisher waits for the subscriber (backpressure up to the collector).
+        - `DROP_OLDEST`: The oldest pending item is dropped.
+        - `COALESCE`: A pending item of the same address is replaced by the newer one, so at most one is pending per
+          address. This is done even if the queue is not full. Otherwise, the oldest pending item is dropped.
+    A `SessionReset` is never dropped. With the dropping policies, the pending items of the old session are discarded
+    when it is queued, as they are superseded by the replay.
+    """
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop-oldest"
+    COALESCE = "coalesce"
+
+    __slots__ = (
+        "max_size",
+        "overflow",
+        "delivered",
+        "dropped",
+        "coalesced",
+        "_broadcaster",
+        "_pending",
+        "_index",
+        "_not_empty",
+        "_not_full",
+        "_closed",
+    )
+
+    def __init__(self, broadcaster: "ChangeBroadcaster", max_size: int, overflow: str):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+        if overflow not in (self.BLOCK, self.DROP_OLDEST, self.COALESCE):
+            raise ValueError("Unknown overflow policy: %r" % (overflow,))
+        self.max_size = max_size
+        self.overflow = overflow
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._broadcaster = broadcaster
+        self._pending = deque()  # [enqueue time, item] entries
+        self._index: Dict[str, list] = {}  # pending entries by address for coalescing
+        # The events are created in the event loop of the first wait (Python < 3.10 binds them at construction).
+        self._not_empty: Optional[asyncio.Event] = None
+        self._not_full: Optional[asyncio.Event] = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of items waiting for the subscriber.
+        """
+        return len(self._pending)
+
+    @property
+    def lag(self) -> float:
+        """
+        Seconds the oldest pending item has been waiting for the subscriber.
+        """
+        if not self._pending:
+            return 0.0
+        return time.monotonic() - self._pending[0][0]
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _drop_oldest(self) -> bool:
+        # After a reset, its marker is the first pending item, the oldest item after it is dropped instead.
+        index = 1 if isinstance(self._pending[0][1], SessionReset) else 0
+        if index == len(self._pending):
+            return False
+        entry = self._pending[index]
+        del self._pending[index]
+        address = entry[1].address
+        if address is not None and self._index.get(address) is entry:
+            del self._index[address]
+        self.dropped += 1
+        return True
+
+    async def put(self, item: Any):
+        if self._closed:
+            return
+        address = item.address
+        if isinstance(item, SessionReset):
+            if self.overflow != self.BLOCK:
+                self.dropped += len(self._pending)
+                self._pending.clear()
+                self._index.clear()
+        elif self.overflow == self.COALESCE:
+            entry = self._index.get(address)
+            if entry is not None:
+                entry[1] = item
+                self.coalesced += 1
+                return
+        while len(self._pending) >= self.max_size:
+            if self.overflow == self.BLOCK:
+                if self._not_full is None:
+                    self._not_full = asyncio.Event()
+                self._not_full.clear()
+                await self._not_full.wait()
+                if self._closed:
+                    return
+            elif not self._drop_oldest():
+                break  # Only the reset marker is pending, it is kept above the limit.
+        entry = [time.monotonic(), item]
+        self._pending.append(entry)
+        if self.overflow == self.COALESCE and address is not None:
+            self._index[address] = entry
+        if self._not_empty is not None:
+            self._not_empty.set()
+
+    async def get(self) -> Any:
+        """
+        Wait for the next item. Raises `EOFError` if the subscription is closed and there are no pending items.
+        """
+        while not self._pending:
+            if self._closed:
+                raise EOFError()
+            if self._not_empty is None:
+                self._not_empty = asyncio.Event()
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        entry = self._pending.popleft()
+        address = entry[1].address
+        if address is not None and self._index.get(address) is entry:
+            del self._index[address]
+        self.delivered += 1
+        if self._not_full is not None:
+            self._not_full.set()
+        return entry[1]
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self.get()
+        except EOFError:
+            raise StopAsyncIteration()
+
+    def close(self):
+        """
+        Unsubscribe. The pending items can still be received.
+        """
+        self._closed = True
+        self._broadcaster.unsubscribe(self)
+        for event in (self._not_empty, self._not_full):
+            if event is not None:
+                event.set()
+
+
+class ChangeBroadcaster(ChangeListener):
+    """
+    Fan-out of the changes recorded by a single collector to any number of asyncio subscribers (register it with
+    `TokenChangeCollector.add_listener`). Any items with an `address` attribute may be published, for example the
+    `TierTransition` events. A tracking session reset is delivered as a `SessionReset` item.
+    """
+
+    __slots__ = ("_subscriptions",)
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+
+    @property
+    def subscriptions(self) -> List[Subscription]:
+        return list(self._subscriptions)
+
+    def subscribe(self, max_size: int = 1024, overflow: str = Subscription.BLOCK) -> Subscription:
+        subscription = Subscription(self, max_size, overflow)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        try:
+            self._subscriptions.remove(subscription)
+        except ValueError:
+            pass
+        if not subscription.closed:
+            subscription.close()
+
+    async def publish(self, items: Iterable[Any]):
+        """
+        Deliver the items to all subscribers. It waits for the blocking subscribers with full queues, these are fed
+        concurrently after the others, so a slow subscriber does not hold back the rest.
+        """
+        items = list(items)
+        blocking = []
+        for subscription in self.subscriptions:
+            if subscription.overflow == Subscription.BLOCK:
+                blocking.append(subscription)
+            else:
+                for item in items:
+                    await subscription.put(item)
+        if len(blocking) == 1:
+            await self._feed(blocking[0], items)
+        elif blocking:
+            await asyncio.gather(*(self._feed(subscription, items) for subscription in blocking))
+
+    @staticmethod
+    async def _feed(subscription: Subscription, items: List[Any]):
+        for item in items:
+            await subscription.put(item)
+
+    async def on_changes(self, changes: List[TokenBalanceChange], session: Optional[int]):
+        await self.publish(changes)
+
+    async def on_reset(self, session: int):
+        await self.publish([SessionReset(session)])
+
+    def close(self):
+        """
+        Close all subscriptions.
+        """
+        for subscription in self.subscriptions:
+            subscription.close()
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import AsyncIterator, Iterable, Optional, Tuple, Union
+
+import aiohttp
+
+from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi.error import BackoffError, IntegrationError
+from encrypticoin_ssi.scheduler import ExponentialBackoff
+
+_DONE = object()
+
+
+class SharedBackoff:
+    """
+    Rate limiting pause shared by concurrent workers. When one of them runs into `BackoffError`, all of them wait.
+    """
+
+    __slots__ = ("backoff", "resume_at")
+
+    def __init__(self, backoff: Optional[ExponentialBackoff] = None):
+        self.backoff = ExponentialBackoff() if backoff is None else backoff
+        self.resume_at = 0.0
+
+    async def wait(self):
+        while True:
+            delay = self.resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def on_backoff(self, retry_after: Optional[float] = None):
+        now = time.monotonic()
+        if now < self.resume_at:  # Already pausing, the request was started before it.
+            return
+        self.resume_at = now + self.backoff.next_delay(retry_after)
+
+    def on_success(self):
+        self.backoff.reset()
+
+
+async def fetch_balances(
+    client, addresses: Iterable[str], concurrency: int = 8, backoff: Optional[SharedBackoff] = None
+) -> AsyncIterator[Tuple[str, Union[TokenBalance, Exception]]]:
+    """
+    Implementation of `ServerIntegrationClient.token_balances`.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be positive")
+    if backoff is None:
+        backoff = SharedBackoff()
+    addresses = iter(addresses)
+    results = asyncio.Queue(concurrency)
+
+    async def worker():
+        try:
+            for address in addresses:
+                while True:
+                    await backoff.wait()
+                    try:
+                        result = await client.token_balance(address)
+                    except BackoffError as e:
+                        backoff.on_backoff(e.retry_after)
+                        continue
+                    except (IntegrationError, aiohttp.ClientError) as e:
+                        result = e
+                    else:
+                        backoff.on_success()
+                    break
+                await results.put((address, result))
+        except Exception as e:  # Unexpected errors are delivered to the consumer.
+            await results.put(e)
+        await results.put(_DONE)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        running = len(workers)
+        while running:
+            item = await results.get()
+            if item is _DONE:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,165 @@
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+import aiohttp
+
+from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi.error import BackoffError, IntegrationError
+
+_MISSING = object()
+
+
+def _fresh_error(error: BaseException) -> BaseException:
+    """
+    Copy of the error without the traceback, so a cached error does not accumulate the frames of each raise.
+    """
+    try:
+        return copy.copy(error)
+    except Exception:  # The error type can not be reconstructed from its arguments.
+        return error.with_traceback(None)
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry when it gets full.
+    """
+
+    __slots__ = ("max_size", "hits", "misses", "_data")
+
+    def __init__(self, max_size: int = 1024):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a value and mark it as recently used. The hit/miss counters are updated.
+        """
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+
+class TTLCache(LRUCache):
+    """
+    Bounded LRU cache where each entry expires after its own time-to-live.
+    """
+
+    __slots__ = ()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[0] <= time.monotonic():
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, ttl: float = 60.0):
+        LRUCache.put(self, key, (time.monotonic() + ttl, value))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        return entry[1]
+
+
+class BalanceCache:
+    """
+    Opt-in caching of the `ServerIntegrationClient.token_balance` results for `ttl` seconds per address.
+    Errors are cached for `error_ttl` seconds (negative caching), except `BackoffError` to respect the `Retry-After`
+    of the API server. Concurrent lookups of the same address are merged into a single request. The cached
+    `TokenBalance` objects are shared between the callers.
+    """
+
+    __slots__ = ("ttl", "error_ttl", "coalesced", "_cache", "_inflight")
+
+    def __init__(self, ttl: float = 10.0, max_size: int = 4096, error_ttl: float = 1.0):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.coalesced = 0
+        self._cache = TTLCache(max_size)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def invalidate(self, address: str):
+        self._cache.pop(address)
+
+    def clear(self):
+        self._cache.clear()
+
+    async def get(self, address: str, fetch: Callable[[str], Awaitable[TokenBalance]]) -> TokenBalance:
+        """
+        Get the cached balance of the address, or load it with `fetch` (shared by the concurrent callers).
+        """
+        entry = self._cache.get(address)
+        if entry is not None:
+            if isinstance(entry, BaseException):
+                raise _fresh_error(entry)
+            return entry
+        future = self._inflight.get(address)
+        if future is None:
+            future = asyncio.ensure_future(self._load(address, fetch))
+            # The result is retrieved here in case all the callers got cancelled.
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[address] = future
+        else:
+            self.coalesced += 1
+        # A cancelled caller shall not cancel the request of the others.
+        return await asyncio.shield(future)
+
+    async def _load(self, address: str, fetch: Callable[[str], Awaitable[TokenBalance]]) -> TokenBalance:
+        try:
+            balance = await fetch(address)
+        except BackoffError:
+            raise
+        except (IntegrationError, aiohttp.ClientError) as e:
+            self._cache.put(address, _fresh_error(e), self.error_ttl)
+            raise
+        else:
+            self._cache.put(address, balance, self.ttl)
+            return balance
+        finally:
+            self._inflight.pop(address, None)
@@ -0,0 +1,59 @@
+from array import array
+from typing import Any, Iterator, List, Optional, Sequence
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+
+
+class ChangeBatch:
+    """
+    Columnar representation of a page of token balance changes with parallel `ids`, `addresses` and `balances`
+    (integers in base units) columns and the shared `decimals` value.
+    The `TokenBalanceChange` objects are only created on demand by indexing or iteration.
+    """
+
+    __slots__ = ("ids", "addresses", "balances", "decimals")
+
+    def __init__(self, ids: Sequence[int], addresses: List[str], balances: List[int], decimals: int):
+        self.ids = ids
+        self.addresses = addresses
+        self.balances = balances
+        self.decimals = decimals
+
+    @classmethod
+    def from_items(cls, items: List[Any], decimals: int) -> "ChangeBatch":
+        """
+        Build the batch from the decoded `changes` items of the API response.
+        Raises `KeyError`, `TypeError` or `ValueError` for malformed items.
+        """
+        ids = array("q")
+        addresses = []
+        balances = []
+        for item in items:
+            ids.append(item["id"])
+            addresses.append(item["address"])
+            balances.append(int(item["balance"]))
+        return cls(ids, addresses, balances, decimals)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> TokenBalanceChange:
+        return TokenBalanceChange(self.ids[index], self.addresses[index], str(self.balances[index]), self.decimals)
+
+    def __iter__(self) -> Iterator[TokenBalanceChange]:
+        for index in range(len(self.ids)):
+            yield self[index]
+
+    @property
+    def last_id(self) -> Optional[int]:
+        if not self.ids:
+            return None
+        return self.ids[-1]
+
+    def next_since(self, since: int) -> int:
+        """
+        The `since` value for the next query after this batch was queried with `since`.
+        """
+        if not self.ids:
+            return since
+        return self.ids[-1] + 1
@@ -1,10 +1,58 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+import codecs
+import contextlib
+import email.utils
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Iterable, Tuple, Union, AsyncIterator
 
 import aiohttp
 
 from encrypticoin_ssi.balance import TokenBalance
 from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.bulk import SharedBackoff, fetch_balances
+from encrypticoin_ssi.cache import BalanceCache
+from encrypticoin_ssi.change_batch import ChangeBatch
+from encrypticoin_ssi.codec import JsonCodec, default_codec
+from encrypticoin_ssi.connection import ConnectionSettings
 from encrypticoin_ssi.error import BackoffError, SignatureValidationError, IntegrationError, TrackingSessionReset
+from encrypticoin_ssi.follow import ChangeFollower
+from encrypticoin_ssi.metrics import ClientMetrics
+from encrypticoin_ssi.rate_limit import RateLimiter, TokenBucket
+from encrypticoin_ssi.resilience import ResiliencePolicy
+from encrypticoin_ssi.scheduler import PollScheduler
+from encrypticoin_ssi.stream import ChangesStreamParser
+
+if TYPE_CHECKING:  # The `eth_account` dependency of the local recovery is slow to import.
+    from encrypticoin_ssi.recovery import LocalSignatureRecovery
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+    return _parse_retry_after(response.headers.get("Retry-After"))
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+def _changes_decimals(result: Dict[str, Any], session: Optional[int]) -> int:
+    decimals = int(result["decimals"])
+    remote_session = result.get("session")
+    if session != remote_session:
+        raise TrackingSessionReset(session, int(remote_session))
+    return decimals
 
 
 class ServerIntegrationClient:
@@ -12,11 +60,23 @@ class ServerIntegrationClient:
     Lightweight client to the integration REST API.
     """
 
-    __slots__ = ("session", "proxy_address", "url_base")
+    __slots__ = (
+        "session",
+        "proxy_address",
+        "url_base",
+        "signature_recovery",
+        "connection",
+        "balance_cache",
+        "codec",
+        "rate_limiter",
+        "resilience",
+        "metrics",
+        "_default_recovery",
+    )
 
     @classmethod
-    def create_url_base(cls, domain: str = "etalon.cash", api_path: str = "/tia"):
-        return "https://%s%s" % (domain, api_path)
+    def create_url_base(cls, domain: str = "etalon.cash", api_path: str = "/tia", scheme: str = "https"):
+        return "%s://%s%s" % (scheme, domain, api_path)
 
     def __init__(
         self,
@@ -24,10 +84,37 @@ class ServerIntegrationClient:
         domain: str = "etalon.cash",
         api_path: str = "/tia",
         proxy_address: Optional[str] = None,
+        signature_recovery: Optional["LocalSignatureRecovery"] = None,
+        connection: Optional[ConnectionSettings] = None,
+        balance_cache: Optional[BalanceCache] = None,
+        codec: Optional[JsonCodec] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        resilience: Optional[ResiliencePolicy] = None,
+        metrics: Optional[ClientMetrics] = None,
+        scheme: str = "https",
     ):
+        """
+        With `signature_recovery` configured, the `wallet_by_signed` validation is done in-process.
+        The `connection` settings are used to create the session in `setup` if it is not provided.
+        With `balance_cache` configured, the `token_balance` results are cached.
+        The JSON bodies are encoded and decoded with the `codec`, the fastest available one by default.
+        With `rate_limiter` configured, the requests are paced on the client side.
+        The `resilience` policy (hedging, circuit breaking) is applied to the `wallet_by_signed` queries.
+        The `scheme` may be set to "http" for a local server, like the `encrypticoin_ssi.standin`.
+        The requests are instrumented with `metrics` if configured. The phases of the requests are only measured if
+        the session is created in `setup`, or it was created with the `metrics.trace_config()`.
+        """
         self.session = session
-        self.url_base = self.create_url_base(domain, api_path)
+        self.url_base = self.create_url_base(domain, api_path, scheme)
         self.proxy_address = proxy_address
+        self.signature_recovery = signature_recovery
+        self.connection = connection
+        self.balance_cache = balance_cache
+        self.codec = default_codec() if codec is None else codec
+        self.rate_limiter = rate_limiter
+        self.resilience = resilience
+        self.metrics = metrics
+        self._default_recovery: Optional["LocalSignatureRecovery"] = None
 
     async def setup(self, session: aiohttp.ClientSession = None):
         """
@@ -35,55 +122,169 @@ class ServerIntegrationClient:
         """
         if self.session is None:
             if session is None:
-                session = aiohttp.ClientSession()
+                kwargs = {}
+                if self.metrics is not None:
+                    kwargs["trace_configs"] = [self.metrics.trace_config()]
+                if self.connection is None:
+                    session = aiohttp.ClientSession(**kwargs)
+                else:
+                    session = self.connection.create_session(**kwargs)
             self.session = session
 
+    async def warm_up(self, connections: int = 1) -> int:
+        """
+        Open (up to) the given number of keep-alive connections to the API server before the traffic arrives.
+        It is done with concurrent `contract_info` queries, which count towards the rate limit.
+        Returns the number of successful queries.
+        """
+        results = await asyncio.gather(*(self.contract_info() for _ in range(connections)), return_exceptions=True)
+        return sum(1 for result in results if not isinstance(result, BaseException))
+
     async def close(self):
+        if self._default_recovery is not None:
+            self._default_recovery.executor.shutdown(wait=False)
+            self._default_recovery = None
         await self.session.close()
         self.session = None
 
+    @contextlib.asynccontextmanager
+    async def _request(
+        self, endpoint: str, body: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        POST the body to the endpoint, or GET it without a body. The request waits for the rate limiter first.
+        """
+        bucket = None if self.rate_limiter is None else self.rate_limiter.bucket(endpoint)
+        if bucket is not None:
+            await bucket.acquire()
+        if body is None:
+            request = self.session.get(self.url_base + "/" + endpoint, proxy=self.proxy_address)
+        else:
+            request = self.session.post(
+                self.url_base + "/" + endpoint,
+                data=self.codec.dumps(body),
+                headers=_JSON_HEADERS,
+                proxy=self.proxy_address,
+            )
+        if self.metrics is None:
+            async with request as r:
+                self._on_response(bucket, r)
+                yield r
+            return
+        self.metrics.on_request_start(endpoint)
+        started = time.monotonic()
+        status = None
+        try:
+            async with request as r:
+                status = r.status
+                self._on_response(bucket, r)
+                yield r
+        finally:
+            self.metrics.on_request_end(endpoint, status, time.monotonic() - started)
+
+    @staticmethod
+    def _on_response(bucket: Optional[TokenBucket], response: aiohttp.ClientResponse):
+        if bucket is not None:
+            if response.status == 429:
+                bucket.on_backoff(_retry_after(response))
+            else:
+                bucket.on_success()
+
+    async def _read_json(self, response: aiohttp.ClientResponse) -> Any:
+        return self.codec.loads(await response.read())
+
     async def wallet_by_signed(self, message: str, signature: str) -> str:
         """
         Query the API server for the validation and recovery of the crypto-wallet address that has signed the message.
         The recovered address (if successfully retrieved) is in checksum format.
+        In local signature recovery mode the API server is only queried if the remote fallback is enabled.
         """
-        async with self.session.post(
-            self.url_base + "/wallet-by-signed",
-            json={"message": message, "signature": signature},
-            proxy=self.proxy_address,
-        ) as r:
+        if self.signature_recovery is not None:
+            try:
+                return self.signature_recovery.recover(message, signature)
+            except SignatureValidationError:
+                if not self.signature_recovery.remote_fallback:
+                    raise
+        if self.resilience is not None:
+            return await self.resilience.call(lambda: self._remote_wallet_by_signed(message, signature))
+        return await self._remote_wallet_by_signed(message, signature)
+
+    async def _remote_wallet_by_signed(self, message: str, signature: str) -> str:
+        async with self._request("wallet-by-signed", {"message": message, "signature": signature}) as r:
             if r.status == 429:
-                raise BackoffError()
+                raise BackoffError(_retry_after(r))
             elif r.status == 400:  # This indicates client error or invalid arguments.
                 raise SignatureValidationError()
             elif r.status != 200:
                 raise IntegrationError()
             try:
-                result = await r.json()
+                result = await self._read_json(r)
             except (TypeError, ValueError):
                 raise IntegrationError()
             if not isinstance(result, dict) or not isinstance(result.get("address"), str):
                 raise IntegrationError()
             return result["address"]
 
+    async def verify_many(self, pairs: Iterable[Tuple[str, str]]) -> List[Union[str, IntegrationError]]:
+        """
+        Validate a batch of (message, signature) pairs and recover the signer addresses, the results are in input
+        order. Failed items are reported with an error instance in place of the address, which is a
+        `SignatureValidationError` for invalid signatures (the same as `wallet_by_signed` would raise).
+        The recovery is always done locally, with the `signature_recovery` settings if configured. If its remote
+        fallback is enabled, the rejected items are queried from the API server one by one.
+        Without `signature_recovery`, a process pool is created on first use for the recovery, it is shut down by
+        `close`.
+        """
+        recovery = self.signature_recovery
+        if recovery is None:
+            recovery = self._default_recovery
+            if recovery is None:
+                from encrypticoin_ssi.recovery import LocalSignatureRecovery
+
+                recovery = self._default_recovery = LocalSignatureRecovery(executor=ProcessPoolExecutor())
+        pairs = list(pairs)
+        results = await recovery.recover_many(pairs)
+        if recovery.remote_fallback:
+            for i, result in enumerate(results):
+                if isinstance(result, SignatureValidationError):
+                    try:
+                        results[i] = await self._remote_wallet_by_signed(*pairs[i])
+                    except IntegrationError as e:
+                        results[i] = e
+        return results
+
     async def token_balance(self, address: str) -> TokenBalance:
         """
         Get the balance of tokens in the crypto-wallet by address.
         The address value is case-sensitive, it must be in proper checksum format.
         """
-        async with self.session.post(
-            self.url_base + "/token-balance", json={"address": address}, proxy=self.proxy_address
-        ) as r:
+        if self.balance_cache is not None:
+            return await self.balance_cache.get(address, self._remote_token_balance)
+        return await self._remote_token_balance(address)
+
+    async def _remote_token_balance(self, address: str) -> TokenBalance:
+        async with self._request("token-balance", {"address": address}) as r:
             if r.status == 429:
-                raise BackoffError()
+                raise BackoffError(_retry_after(r))
             elif r.status != 200:
                 raise IntegrationError()
             try:
-                result = await r.json()
+                result = await self._read_json(r)
                 return TokenBalance(address, result["balance"], result["decimals"])
             except (AttributeError, TypeError, ValueError):
                 raise IntegrationError()
 
+    def token_balances(
+        self, addresses: Iterable[str], concurrency: int = 8, backoff: Optional[SharedBackoff] = None
+    ) -> AsyncIterator[Tuple[str, Union[TokenBalance, Exception]]]:
+        """
+        Get the balances of many crypto-wallets with at most `concurrency` parallel `token_balance` queries.
+        The (address, result) pairs are yielded in completion order, the addresses are consumed lazily. The result is
+        the error instance if the query of an address has failed. Rate limiting pauses all the queries (with the
+        shared `backoff` state) and they are retried.
+        """
+        return fetch_balances(self, addresses, concurrency, backoff)
+
     async def token_changes(self, since: int, session: Optional[int] = None) -> List[TokenBalanceChange]:
         """
         Get the token balance changes from the `since` number, in consistency with the used `session`.
@@ -91,37 +292,107 @@ class ServerIntegrationClient:
         The next query shall be made with `changes[-1].id + 1`, or repeated with `since` if no changes were retrieved.
         If the session is interrupted, `TrackingSessionReset` will be raised and the tracking needs to be re-initialized.
         """
-        async with self.session.post(
-            self.url_base + "/token-changes", json={"since": since}, proxy=self.proxy_address
-        ) as r:
+        items, decimals = await self._query_changes(since, session)
+        try:
+            return [TokenBalanceChange(c["id"], c["address"], c["balance"], decimals) for c in items]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise IntegrationError()
+
+    async def token_changes_batch(self, since: int, session: Optional[int] = None) -> ChangeBatch:
+        """
+        Columnar variant of `token_changes` for bulk consumers: the changes are returned as a `ChangeBatch` with
+        the balances parsed to integers once. The next query shall be made with `batch.next_since(since)`.
+        """
+        items, decimals = await self._query_changes(since, session)
+        try:
+            return ChangeBatch.from_items(items, decimals)
+        except (AttributeError, KeyError, TypeError, ValueError, OverflowError):
+            raise IntegrationError()
+
+    async def _query_changes(self, since: int, session: Optional[int]) -> Tuple[List[Any], int]:
+        async with self._request("token-changes", {"since": since}) as r:
             if r.status == 429:
-                raise BackoffError()
+                raise BackoffError(_retry_after(r))
             elif r.status != 200:
                 raise IntegrationError()
-            changes = []
             try:
-                result = await r.json()
-                decimals = int(result["decimals"])
-                remote_session = result.get("session")
-                if session != remote_session:
-                    raise TrackingSessionReset(session, int(remote_session))
-                for change in result["changes"]:
-                    changes.append(TokenBalanceChange(change["id"], change["address"], change["balance"], decimals))
-            except (AttributeError, TypeError, ValueError):
+                result = await self._read_json(r)
+                decimals = _changes_decimals(result, session)
+                items = result["changes"]
+                if not isinstance(items, list):
+                    raise TypeError()
+                return items, decimals
+            except (AttributeError, KeyError, TypeError, ValueError):
                 raise IntegrationError()
-            return changes
+
+    async def iter_token_changes(
+        self, since: int, session: Optional[int] = None, chunk_size: int = 65536
+    ) -> AsyncIterator[TokenBalanceChange]:
+        """
+        Streaming variant of `token_changes`: the changes are yielded as they are decoded from the response body,
+        so large pages do not need to be loaded into memory at once. The `session` and `decimals` of the response are
+        validated before the first change is yielded. A malformed response raises `IntegrationError`, but only when
+        it is reached, so the changes yielded before shall only be committed when the iteration has completed.
+        """
+        async with self._request("token-changes", {"since": since}) as r:
+            if r.status == 429:
+                raise BackoffError(_retry_after(r))
+            elif r.status != 200:
+                raise IntegrationError()
+            parser = ChangesStreamParser()
+            text_decoder = codecs.getincrementaldecoder("utf-8")()
+            decimals = None
+            pending = []
+            try:
+                async for chunk in r.content.iter_chunked(chunk_size):
+                    pending.extend(parser.feed(text_decoder.decode(chunk)))
+                    if decimals is None and "decimals" in parser.header and "session" in parser.header:
+                        decimals = _changes_decimals(parser.header, session)
+                    if decimals is not None and pending:
+                        changes = [TokenBalanceChange(c["id"], c["address"], c["balance"], decimals) for c in pending]
+                        pending.clear()
+                        for change in changes:
+                            yield change
+                pending.extend(parser.feed(text_decoder.decode(b"", final=True)))
+                pending.extend(parser.close())
+                if decimals is None:
+                    decimals = _changes_decimals(parser.header, session)
+                changes = [TokenBalanceChange(c["id"], c["address"], c["balance"], decimals) for c in pending]
+            except (AttributeError, KeyError, TypeError, ValueError):
+                raise IntegrationError()
+            for change in changes:
+                yield change
+
+    def follow_changes(
+        self,
+        since: int,
+        session: Optional[int] = None,
+        prefetch: int = 1,
+        scheduler: Optional[PollScheduler] = None,
+    ) -> ChangeFollower:
+        """
+        Iterate the pages of token balance changes continuously from the `since` number, in consistency with the used
+        `session`. The next page is already being fetched while the current one is processed:
+
+            async with tia.follow_changes(since, session) as pages:
+                async for changes in pages:
+                    ...
+
+        See `ChangeFollower` for the details.
+        """
+        return ChangeFollower(self, since, session, prefetch, scheduler)
 
     async def contract_info(self) -> Dict[str, Any]:
         """
         Get some info about the contract.
         The returned keys are currently `contract_address`, `block_number` and `decimals`.
         """
-        async with self.session.get(self.url_base + "/contract-info", proxy=self.proxy_address) as r:
+        async with self._request("contract-info") as r:
             if r.status == 429:
-                raise BackoffError()
+                raise BackoffError(_retry_after(r))
             elif r.status != 200:
                 raise IntegrationError()
             try:
-                return await r.json()
+                return await self._read_json(r)
             except (TypeError, ValueError):
                 raise IntegrationError()
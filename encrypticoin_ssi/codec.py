@@ -0,0 +1,39 @@
+import json
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class JsonCodec:
+    """
+    The JSON functions used by the client for the request and response bodies.
+    The `loads` callable decodes from bytes, the `dumps` callable encodes to bytes.
+    """
+
+    __slots__ = ("name", "loads", "dumps")
+
+    def __init__(self, name: str, loads: Callable[[bytes], Any], dumps: Callable[[Any], bytes]):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+STDLIB_CODEC = JsonCodec("json", json.loads, _json_dumps)
+
+ORJSON_CODEC = None if orjson is None else JsonCodec("orjson", orjson.loads, orjson.dumps)
+
+
+def default_codec() -> JsonCodec:
+    """
+    The fastest available codec: `orjson` if it is installed (the `fast` extra), or the standard library.
+    """
+    if ORJSON_CODEC is not None:
+        return ORJSON_CODEC
+    return STDLIB_CODEC
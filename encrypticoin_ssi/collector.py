@@ -0,0 +1,104 @@
+import asyncio
+from typing import List, Optional
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi.error import TrackingSessionReset
+from encrypticoin_ssi.scheduler import PollScheduler
+from encrypticoin_ssi.storage import ChangeStorage
+
+
+class ChangeListener:
+    """
+    Receiver of the changes recorded by a `TokenChangeCollector`, called after the storage was updated.
+    """
+
+    __slots__ = ()
+
+    async def on_changes(self, changes: List[TokenBalanceChange], session: Optional[int]):
+        pass
+
+    async def on_reset(self, session: int):
+        pass
+
+
+class TokenChangeCollector:
+    """
+    Incremental collector of the token balance changes into a `ChangeStorage`.
+    The collection resumes from the stored checkpoint after a restart, the storage is only cleared when the tracking
+    session is reset. It shall be run in a single instance for a storage.
+    The registered listeners are notified after each update of the storage.
+    """
+
+    __slots__ = ("client", "storage", "scheduler", "since", "session", "listeners")
+
+    def __init__(
+        self,
+        client: ServerIntegrationClient,
+        storage: ChangeStorage,
+        scheduler: Optional[PollScheduler] = None,
+    ):
+        self.client = client
+        self.storage = storage
+        self.scheduler = PollScheduler() if scheduler is None else scheduler
+        self.since = None
+        self.session = None
+        self.listeners: List[ChangeListener] = []
+
+    def add_listener(self, listener: ChangeListener):
+        self.listeners.append(listener)
+
+    async def _run_storage(self, func, *args):
+        # The storage operations are blocking, they shall not stall the event loop.
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def load(self):
+        """
+        Load the checkpoint from the storage. It is done automatically before the first collection.
+        """
+        self.since, self.session = await self._run_storage(self.storage.load_checkpoint)
+
+    async def collect(self) -> List[TokenBalanceChange]:
+        """
+        Query a single page of changes and record it into the storage.
+        On a tracking session reset, the storage is cleared and the collection restarts in the new session.
+        """
+        if self.since is None:
+            await self.load()
+        while True:
+            try:
+                changes = await self.client.token_changes(self.since, self.session)
+            except TrackingSessionReset as e:
+                await self._reset(e.new_session)
+                continue
+            await self._apply(changes)
+            return changes
+
+    async def run(self):
+        """
+        Collect the changes continuously until cancelled. The polling is paced by the `scheduler`, and the next page
+        is fetched while the current one is written to the storage.
+        """
+        if self.since is None:
+            await self.load()
+        while True:
+            async with self.client.follow_changes(self.since, self.session, scheduler=self.scheduler) as pages:
+                try:
+                    async for changes in pages:
+                        await self._apply(changes)
+                except TrackingSessionReset as e:
+                    await self._reset(e.new_session)
+
+    async def _apply(self, changes: List[TokenBalanceChange]):
+        if changes:
+            await self._run_storage(self.storage.apply_changes, changes, self.session)
+            self.since = changes[-1].id + 1
+            for listener in self.listeners:
+                await listener.on_changes(changes, self.session)
+
+    async def _reset(self, session: int):
+        await self._run_storage(self.storage.reset, session)
+        self.since = 0
+        self.session = session
+        for listener in self.listeners:
+            await listener.on_reset(session)
@@ -0,0 +1,73 @@
+from typing import Optional
+
+import aiohttp
+
+
+class ConnectionSettings:
+    """
+    Connection pool and timeout configuration for the `aiohttp` session created by `ServerIntegrationClient.setup`.
+    The timeouts are in seconds, `None` disables them. A `connector` may be shared by several clients, it is not
+    closed together with the sessions then. The `create_connector` method can be used to create such a connector.
+    """
+
+    __slots__ = (
+        "limit",
+        "limit_per_host",
+        "keepalive_timeout",
+        "ttl_dns_cache",
+        "total_timeout",
+        "connect_timeout",
+        "read_timeout",
+        "connector",
+    )
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 16,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: Optional[int] = 300,
+        total_timeout: Optional[float] = 30.0,
+        connect_timeout: Optional[float] = 5.0,
+        read_timeout: Optional[float] = 10.0,
+        connector: Optional[aiohttp.BaseConnector] = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.total_timeout = total_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.connector = connector
+
+    def create_connector(self) -> aiohttp.TCPConnector:
+        """
+        Create a connection pool with the configured limits. It must be called with a running event loop.
+        """
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=self.ttl_dns_cache is not None,
+            ttl_dns_cache=self.ttl_dns_cache,
+        )
+
+    def create_timeout(self) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=self.total_timeout, sock_connect=self.connect_timeout, sock_read=self.read_timeout
+        )
+
+    def create_session(self, **kwargs) -> aiohttp.ClientSession:
+        """
+        Create a session using the shared connector, or a new connection pool owned by the session.
+        """
+        connector = self.connector
+        if connector is None:
+            connector = self.create_connector()
+        return aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=self.connector is None,
+            timeout=self.create_timeout(),
+            **kwargs,
+        )
@@ -6,7 +6,15 @@ class IntegrationError(Exception):
 
 
 class BackoffError(IntegrationError):
-    pass
+    def __init__(self, retry_after: Optional[float] = None):
+        IntegrationError.__init__(self, retry_after)
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        """
+        Seconds to wait before retrying, if the server has indicated it with the `Retry-After` header.
+        """
+        return self.args[0]
 
 
 class SignatureValidationError(IntegrationError):
@@ -24,3 +32,27 @@ class TrackingSessionReset(IntegrationError):
     @property
     def new_session(self) -> int:
         return self.args[1]
+
+
+class CircuitOpenError(IntegrationError):
+    """
+    The request was not made, as the API server is considered unhealthy after repeated failures.
+    """
+
+    pass
+
+
+class ChallengeError(IntegrationError):
+    """
+    The challenge `message_id` is malformed, forged or bound to another session.
+    """
+
+    pass
+
+
+class ChallengeExpired(ChallengeError):
+    pass
+
+
+class ChallengeReplayed(ChallengeError):
+    pass
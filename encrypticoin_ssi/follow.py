@@ -0,0 +1,97 @@
+import asyncio
+from typing import List, Optional
+
+import aiohttp
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.error import BackoffError, IntegrationError, TrackingSessionReset
+from encrypticoin_ssi.scheduler import PollScheduler
+
+
+class ChangeFollower:
+    """
+    Asynchronous iterator over the pages of the token change stream (see `ServerIntegrationClient.follow_changes`).
+    The next page is fetched in the background while the current one is processed, at most `prefetch` pages ahead.
+    Only non-empty pages are yielded. The polling is paced by the `scheduler`, rate limiting and errors of the queries
+    are retried. On a tracking session reset, `TrackingSessionReset` is raised after the pages retrieved before it,
+    and the iteration ends.
+    Use it as an asynchronous context manager (or call `aclose()`) to stop the background fetching. A plain
+    `async for` loop that breaks or is cancelled leaves it running.
+    """
+
+    __slots__ = ("client", "since", "session", "scheduler", "prefetch", "_queue", "_task", "_finished")
+
+    def __init__(
+        self,
+        client,
+        since: int,
+        session: Optional[int] = None,
+        prefetch: int = 1,
+        scheduler: Optional[PollScheduler] = None,
+    ):
+        if prefetch < 1:
+            raise ValueError("prefetch must be positive")
+        self.client = client
+        self.since = since
+        self.session = session
+        self.scheduler = PollScheduler() if scheduler is None else scheduler
+        self.prefetch = prefetch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._finished = False
+
+    def __aiter__(self) -> "ChangeFollower":
+        return self
+
+    async def __anext__(self) -> List[TokenBalanceChange]:
+        if self._finished:
+            raise StopAsyncIteration()
+        if self._task is None:
+            self._queue = asyncio.Queue(self.prefetch)
+            self._task = asyncio.create_task(self._fetch(self.since))
+        item = await self._queue.get()
+        if isinstance(item, BaseException):
+            self._finished = True
+            raise item
+        self.since = item[-1].id + 1
+        return item
+
+    async def __aenter__(self) -> "ChangeFollower":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Stop the background fetching. The pages that were prefetched but not yet yielded are discarded.
+        """
+        self._finished = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _fetch(self, since: int):
+        try:
+            while True:
+                try:
+                    page = await self.client.token_changes(since, self.session)
+                except TrackingSessionReset as e:
+                    await self._queue.put(e)
+                    return
+                except BackoffError as e:
+                    delay = self.scheduler.on_backoff(e.retry_after)
+                except (IntegrationError, aiohttp.ClientError):
+                    delay = self.scheduler.on_error()
+                else:
+                    delay = self.scheduler.on_page(len(page))
+                    if page:
+                        since = page[-1].id + 1
+                        await self._queue.put(page)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        except Exception as e:  # Unexpected errors are delivered to the consumer instead of stalling it.
+            await self._queue.put(e)
@@ -1,4 +1,57 @@
-from typing import Optional
+import hashlib
+import hmac
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from encrypticoin_ssi.error import ChallengeError, ChallengeExpired, ChallengeReplayed
+
+
+class UsedNonceRegistry:
+    """
+    Bounded set of the used challenge nonces for replay protection. The nonces are kept only until the expiry of their
+    challenge, in buckets of `resolution` seconds by expiry, so the expired ones are dropped a bucket at a time.
+    """
+
+    __slots__ = ("resolution", "max_nonces", "_buckets", "_count", "_lock")
+
+    def __init__(self, resolution: float = 10.0, max_nonces: int = 1000000):
+        """
+        When `max_nonces` unexpired nonces are registered, the bucket expiring earliest is dropped to make room, so
+        a flood of challenges can not block the others. The dropped nonces may be replayed with their `binding` until
+        they expire, so `max_nonces` shall cover the expected number of challenges within `max_ttl`.
+        """
+        self.resolution = resolution
+        self.max_nonces = max_nonces
+        self._buckets: Dict[int, Set[str]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _expire(self, now: float):
+        # The bucket covers expiry times until `(bucket + 1) * resolution`, it is dropped after that.
+        current = math.floor(now / self.resolution)
+        for bucket in [b for b in self._buckets if b < current]:
+            self._count -= len(self._buckets.pop(bucket))
+
+    def use(self, nonce: str, expiry: float, now: float) -> bool:
+        """
+        Register the nonce of a challenge. Returns False if it was already used.
+        """
+        with self._lock:
+            self._expire(now)
+            key = math.floor(expiry / self.resolution)
+            if nonce in self._buckets.get(key, ()):
+                return False
+            while self._count >= self.max_nonces and self._buckets:
+                self._count -= len(self._buckets.pop(min(self._buckets)))
+            self._buckets.setdefault(key, set()).add(nonce)
+            self._count += 1
+            return True
 
 
 class ProofMessageFactory:
@@ -7,17 +60,30 @@ class ProofMessageFactory:
     The message to be signed by the client is actually arbitrary, but this is the baseline recommendation for:
         - Having a short human-readable description for transparency.
         - Including an arbitrary identifier managed by the server.
+    With a `secret_key`, the factory issues stateless challenge identifiers, that need no server-side storage.
     """
 
-    __slots__ = ("description",)
+    __slots__ = ("description", "secret_key", "max_ttl", "used_nonces")
 
-    def __init__(self, description: str):
+    def __init__(
+        self,
+        description: str,
+        secret_key: Optional[bytes] = None,
+        max_ttl: float = 300.0,
+        used_nonces: Optional[UsedNonceRegistry] = None,
+    ):
         """
         Description should be a concise explanation for the signature request. For example:
             - Wallet ownership proof for token attribution at XY web-shop.
             - Wallet ownership proof for token attribution by linking to account at XY web-shop.
+        The `secret_key` shall be a secure random value of at least 32 bytes, shared by the server processes.
+        The replay protection of the `used_nonces` registry is per process, so a challenge may be used once in each
+        server process. With multiple processes, the `binding` shall be strict enough to make this acceptable.
         """
         self.description = description
+        self.secret_key = secret_key
+        self.max_ttl = max_ttl
+        self.used_nonces = UsedNonceRegistry() if used_nonces is None else used_nonces
 
     def create(self, message_id: str) -> str:
         """
@@ -35,3 +101,41 @@ class ProofMessageFactory:
         id_prefix = "%s\nId: " % (self.description,)
         if maybe_message.startswith(id_prefix):
             return maybe_message[len(id_prefix) :]
+
+    def _mac(self, expiry: str, nonce: str, binding: str) -> str:
+        if self.secret_key is None:
+            raise ValueError("secret_key is required for challenges")
+        data = "\n".join((self.description, expiry, nonce, binding)).encode("utf-8")
+        return hmac.new(self.secret_key, data, hashlib.sha256).hexdigest()
+
+    def create_challenge(self, binding: str, ttl: float = 60.0, now: Optional[float] = None) -> str:
+        """
+        Create a `message_id` that expires after `ttl` seconds, in the `expiry-nonce-mac` format. The `binding`
+        shall identify the session of the user (e.g. a random session identifier), the challenge is valid only with it.
+        Use `create` to produce the message from it.
+        """
+        if not 0 < ttl <= self.max_ttl:
+            raise ValueError("ttl must be positive and at most max_ttl")
+        expiry = str(math.ceil((time.time() if now is None else now) + ttl))
+        nonce = os.urandom(16).hex()
+        return "-".join((expiry, nonce, self._mac(expiry, nonce, binding)))
+
+    def verify_challenge(self, message_id: str, binding: str, now: Optional[float] = None):
+        """
+        Check a `message_id` created by `create_challenge` with the same `binding`, and register it as used.
+        Raises `ChallengeError` if it is invalid, `ChallengeExpired` or `ChallengeReplayed`.
+        """
+        parts = message_id.split("-")
+        if len(parts) != 3 or not parts[0].isdigit():
+            raise ChallengeError()
+        expiry, nonce, mac = parts
+        if not hmac.compare_digest(mac.encode("utf-8"), self._mac(expiry, nonce, binding).encode("utf-8")):
+            raise ChallengeError()
+        if now is None:
+            now = time.time()
+        if int(expiry) < now:
+            raise ChallengeExpired()
+        if int(expiry) > now + self.max_ttl + 1:  # The expiry is rounded up to whole seconds.
+            raise ChallengeError()
+        if not self.used_nonces.use(nonce, int(expiry), now):
+            raise ChallengeReplayed()
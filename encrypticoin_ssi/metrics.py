@@ -0,0 +1,225 @@
+import abc
+import bisect
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASES = ("dns", "connect", "ttfb", "total")
+
+# A metric family: name, type, help and the samples as (name, labels, value).
+MetricFamily = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values, with the upper bounds of the `buckets`.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is the +Inf bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        The (upper bound, cumulative count) pairs in Prometheus format.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+def _endpoint(url) -> str:
+    return url.path.rpartition("/")[2]
+
+
+class ClientMetrics:
+    """
+    Instrumentation of the API requests by endpoint: latency histograms of the phases (DNS resolution, connection
+    setup, time to the response headers and the total time with the body read), response status counters, bytes
+    transferred, connection reuse and in-flight requests.
+    The client reports the requests, the phases and transfers are measured by the `trace_config` of the session,
+    which the client adds if it creates the session.
+    """
+
+    __slots__ = (
+        "buckets",
+        "latency",
+        "statuses",
+        "errors",
+        "bytes_sent",
+        "bytes_received",
+        "connections_created",
+        "connections_reused",
+        "in_flight",
+    )
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}  # by (endpoint, phase)
+        self.statuses: Dict[Tuple[str, int], int] = {}
+        self.errors: Dict[str, int] = {}  # requests failed without a response
+        self.bytes_sent: Dict[str, int] = {}
+        self.bytes_received: Dict[str, int] = {}
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.in_flight: Dict[str, int] = {}
+
+    def observe(self, endpoint: str, phase: str, seconds: float):
+        histogram = self.latency.get((endpoint, phase))
+        if histogram is None:
+            histogram = self.latency[(endpoint, phase)] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def on_request_start(self, endpoint: str):
+        self.in_flight[endpoint] = self.in_flight.get(endpoint, 0) + 1
+
+    def on_request_end(self, endpoint: str, status: Optional[int], seconds: float):
+        """
+        Report the completion of a request, the `status` is `None` if it has failed without a response.
+        """
+        self.in_flight[endpoint] -= 1
+        if status is None:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        else:
+            self.statuses[(endpoint, status)] = self.statuses.get((endpoint, status), 0) + 1
+        self.observe(endpoint, "total", seconds)
+
+    @property
+    def reuse_ratio(self) -> float:
+        """
+        The ratio of the requests that were sent on a pooled connection.
+        """
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else 0.0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context: SimpleNamespace, params):
+            context.endpoint = _endpoint(params.url)
+            context.started = time.monotonic()
+
+        async def on_dns_resolvehost_start(session, context: SimpleNamespace, params):
+            context.dns_started = time.monotonic()
+
+        async def on_dns_resolvehost_end(session, context: SimpleNamespace, params):
+            self.observe(context.endpoint, "dns", time.monotonic() - context.dns_started)
+
+        async def on_connection_create_start(session, context: SimpleNamespace, params):
+            context.connect_started = time.monotonic()
+
+        async def on_connection_create_end(session, context: SimpleNamespace, params):
+            self.connections_created += 1
+            self.observe(context.endpoint, "connect", time.monotonic() - context.connect_started)
+
+        async def on_connection_reuseconn(session, context: SimpleNamespace, params):
+            self.connections_reused += 1
+
+        async def on_request_chunk_sent(session, context: SimpleNamespace, params):
+            self.bytes_sent[context.endpoint] = self.bytes_sent.get(context.endpoint, 0) + len(params.chunk)
+
+        async def on_response_chunk_received(session, context: SimpleNamespace, params):
+            self.bytes_received[context.endpoint] = self.bytes_received.get(context.endpoint, 0) + len(params.chunk)
+
+        async def on_request_end(session, context: SimpleNamespace, params):
+            self.observe(context.endpoint, "ttfb", time.monotonic() - context.started)
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+        trace.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace.on_connection_create_start.append(on_connection_create_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_request_chunk_sent.append(on_request_chunk_sent)
+        trace.on_response_chunk_received.append(on_response_chunk_received)
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    def collect(self) -> List[MetricFamily]:
+        """
+        The current values as metric families.
+        """
+        name = "tia_client_request_duration_seconds"
+        samples = []
+        for (endpoint, phase), histogram in sorted(self.latency.items()):
+            labels = {"endpoint": endpoint, "phase": phase}
+            for bound, count in histogram.cumulative():
+                samples.append((name + "_bucket", dict(labels, le=bound), count))
+            samples.append((name + "_sum", labels, histogram.sum))
+            samples.append((name + "_count", labels, histogram.count))
+        families = [(name, "histogram", "Duration of the request phases.", samples)]
+        name = "tia_client_responses_total"
+        samples = [
+            (name, {"endpoint": endpoint, "status": str(status)}, count)
+            for (endpoint, status), count in sorted(self.statuses.items())
+        ]
+        families.append((name, "counter", "Responses by status code.", samples))
+        name = "tia_client_errors_total"
+        samples = [(name, {"endpoint": endpoint}, count) for endpoint, count in sorted(self.errors.items())]
+        families.append((name, "counter", "Requests failed without a response.", samples))
+        for name, values, description in (
+            ("tia_client_sent_bytes_total", self.bytes_sent, "Bytes of the request bodies."),
+            ("tia_client_received_bytes_total", self.bytes_received, "Bytes of the response bodies."),
+        ):
+            samples = [(name, {"endpoint": endpoint}, count) for endpoint, count in sorted(values.items())]
+            families.append((name, "counter", description, samples))
+        name = "tia_client_connections_total"
+        samples = [
+            (name, {"kind": "created"}, self.connections_created),
+            (name, {"kind": "reused"}, self.connections_reused),
+        ]
+        families.append((name, "counter", "Connections used for the requests.", samples))
+        name = "tia_client_in_flight_requests"
+        samples = [(name, {"endpoint": endpoint}, count) for endpoint, count in sorted(self.in_flight.items())]
+        families.append((name, "gauge", "Requests in progress.", samples))
+        return families
+
+    def export(self, sink: "MetricsSink"):
+        sink.export(self.collect())
+
+
+class MetricsSink(abc.ABC):
+    """
+    Receiver of the collected metrics, to be implemented for the monitoring system in use.
+    """
+
+    __slots__ = ()
+
+    @abc.abstractmethod
+    def export(self, families: List[MetricFamily]):
+        pass
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def prometheus_text(families: List[MetricFamily]) -> str:
+    """
+    Format the metric families in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, kind, description, samples in families:
+        lines.append("# HELP %s %s" % (name, description))
+        lines.append("# TYPE %s %s" % (name, kind))
+        for sample, labels, value in samples:
+            if labels:
+                sample += "{%s}" % ",".join('%s="%s"' % (key, _escape(str(v))) for key, v in labels.items())
+            lines.append("%s %r" % (sample, value))
+    return "\n".join(lines) + "\n"
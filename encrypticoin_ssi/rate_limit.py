@@ -0,0 +1,131 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+ENDPOINTS = ("wallet-by-signed", "token-balance", "token-changes", "contract-info")
+
+
+class TokenBucket:
+    """
+    Request rate limiter with a token bucket: requests are admitted at `rate` per second on average, with bursts of
+    up to `burst` requests. The waiting requests are admitted in arrival order.
+    The rate adapts to the rate limiting of the server (AIMD): it is cut by the `decrease` factor when a request is
+    rejected (at most once per second, as the rejections of a burst arrive together), and grows back linearly by
+    `increase` requests per second each second while the requests succeed, up to `max_rate`.
+    """
+
+    __slots__ = (
+        "rate",
+        "burst",
+        "min_rate",
+        "max_rate",
+        "increase",
+        "decrease",
+        "_tokens",
+        "_updated",
+        "_resume_at",
+        "_decreased_at",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1.0,
+        min_rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+    ):
+        """
+        The `rate` shall be configured just below the limit of the server, it is the `max_rate` by default.
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("The rate must be positive and the burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = rate / 100 if min_rate is None else min_rate
+        self.max_rate = rate if max_rate is None else max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._decreased_at = float("-inf")
+        self._lock: Optional[asyncio.Lock] = None  # Created in the event loop of the first use (Python < 3.10).
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+    async def acquire(self):
+        """
+        Wait until the request may be made.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:  # The lock is fair, so the waiters are admitted in order.
+            while True:
+                now = time.monotonic()
+                if now < self._resume_at:
+                    await asyncio.sleep(self._resume_at - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_backoff(self, retry_after: Optional[float] = None):
+        """
+        Register a rate limited request, with the `Retry-After` hint of the server.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = 0.0
+        if retry_after:
+            self._resume_at = max(self._resume_at, now + retry_after)
+        if now - self._decreased_at >= 1.0:
+            self._decreased_at = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+
+
+class RateLimiter:
+    """
+    Client side rate limiting of the API endpoints (see `ENDPOINTS`) with token buckets. The endpoints may have
+    separate budgets, or share a budget by sharing the bucket. The endpoints without a bucket are not limited.
+    """
+
+    __slots__ = ("buckets",)
+
+    def __init__(self, buckets: Dict[str, TokenBucket]):
+        unknown = set(buckets) - set(ENDPOINTS)
+        if unknown:
+            raise ValueError("Unknown endpoints: %s" % ", ".join(sorted(unknown)))
+        self.buckets = buckets
+
+    @classmethod
+    def shared(cls, rate: float, burst: float = 1.0) -> "RateLimiter":
+        """
+        All the endpoints share a single budget.
+        """
+        bucket = TokenBucket(rate, burst)
+        return cls({endpoint: bucket for endpoint in ENDPOINTS})
+
+    @classmethod
+    def per_endpoint(cls, rate: float, burst: float = 1.0) -> "RateLimiter":
+        """
+        Each endpoint has its own budget of the same size.
+        """
+        return cls({endpoint: TokenBucket(rate, burst) for endpoint in ENDPOINTS})
+
+    def bucket(self, endpoint: str) -> Optional[TokenBucket]:
+        return self.buckets.get(endpoint)
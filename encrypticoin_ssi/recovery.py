@@ -0,0 +1,115 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from encrypticoin_ssi.cache import LRUCache
+from encrypticoin_ssi.error import SignatureValidationError
+
+_eth_account = None
+
+
+def _load_eth_account():
+    """
+    The `eth_account` package is imported on first use, as it is slow to import and only needed for local recovery.
+    """
+    global _eth_account
+    if _eth_account is None:
+        try:
+            from eth_account import Account
+            from eth_account.messages import encode_defunct
+        except ImportError:  # pragma: no cover
+            raise ImportError("eth-account is required for local signature recovery, install the `recovery` extra")
+        _eth_account = (Account, encode_defunct)
+    return _eth_account
+
+
+def recover_wallet(message: str, signature: str) -> str:
+    """
+    Validate the personal-sign `signature` of the `message` and recover the signer crypto-wallet address in-process.
+    The recovered address is in checksum format, the same as returned by `/wallet-by-signed`.
+    """
+    account, encode_defunct = _load_eth_account()
+    if not isinstance(message, str) or not isinstance(signature, str):
+        raise SignatureValidationError()
+    try:
+        return account.recover_message(encode_defunct(text=message), signature=signature)
+    except Exception:  # The backend raises a variety of error types for malformed signatures.
+        raise SignatureValidationError()
+
+
+def recover_wallets(pairs: Sequence[Tuple[str, str]]) -> List[Union[str, SignatureValidationError]]:
+    """
+    Recover the signer addresses of a chunk of (message, signature) pairs.
+    Failed items are reported with a `SignatureValidationError` instance in place of the address.
+    """
+    results = []
+    for message, signature in pairs:
+        try:
+            results.append(recover_wallet(message, signature))
+        except SignatureValidationError as e:
+            results.append(e)
+    return results
+
+
+class LocalSignatureRecovery:
+    """
+    Configuration of the local (offline) signature recovery mode of `ServerIntegrationClient.wallet_by_signed`.
+    Recent results are kept in a bounded LRU cache keyed by the (message, signature) pair.
+    If `remote_fallback` is set, the API server is queried when the local recovery rejects the signature.
+    Batches are recovered in chunks of `chunk_size` on the `executor`, which should be a process pool for large
+    batches. Without it the default executor of the event loop is used.
+    """
+
+    __slots__ = ("remote_fallback", "cache", "executor", "chunk_size")
+
+    def __init__(
+        self,
+        cache_size: int = 1024,
+        remote_fallback: bool = False,
+        executor: Optional[Executor] = None,
+        chunk_size: int = 64,
+    ):
+        _load_eth_account()
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        self.remote_fallback = remote_fallback
+        self.cache = LRUCache(cache_size)
+        self.executor = executor
+        self.chunk_size = chunk_size
+
+    def recover(self, message: str, signature: str) -> str:
+        """
+        Recover the signer address, or raise `SignatureValidationError` if the signature is invalid.
+        """
+        key = (message, signature)
+        address = self.cache.get(key)
+        if address is None:
+            address = recover_wallet(message, signature)
+            self.cache.put(key, address)
+        return address
+
+    async def recover_many(self, pairs: Iterable[Tuple[str, str]]) -> List[Union[str, SignatureValidationError]]:
+        """
+        Recover the signer addresses of the (message, signature) pairs on the executor, results are in input order.
+        Failed items are reported with a `SignatureValidationError` instance in place of the address.
+        """
+        pairs = [(message, signature) for message, signature in pairs]
+        results = [None] * len(pairs)
+        pending = []
+        for i, key in enumerate(pairs):
+            address = self.cache.get(key)
+            if address is None:
+                pending.append(i)
+            else:
+                results[i] = address
+        chunks = [pending[i : i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+        loop = asyncio.get_running_loop()
+        chunk_results = await asyncio.gather(
+            *(loop.run_in_executor(self.executor, recover_wallets, [pairs[i] for i in chunk]) for chunk in chunks)
+        )
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for i, result in zip(chunk, chunk_result):
+                results[i] = result
+                if isinstance(result, str):
+                    self.cache.put(pairs[i], result)
+        return results
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+import aiohttp
+
+from encrypticoin_ssi.error import BackoffError, CircuitOpenError, IntegrationError, SignatureValidationError
+
+T = TypeVar("T")
+
+
+def _is_answer(error: BaseException) -> bool:
+    """
+    Whether the error is a valid answer of a healthy server, that shall not be retried or counted as a failure.
+    """
+    return isinstance(error, (SignatureValidationError, BackoffError))
+
+
+class LatencyTracker:
+    """
+    Percentiles of the latest `size` latency samples.
+    """
+
+    __slots__ = ("samples", "min_samples")
+
+    def __init__(self, size: int = 256, min_samples: int = 20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        The `q` (0-1) percentile of the samples, or `None` while there are fewer than `min_samples`.
+        """
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgePolicy:
+    """
+    When a request takes longer than the `percentile` of the recent latencies, a duplicate request is sent (up to
+    `max_hedges` times), and the first answer is taken. The hedge delay is `initial_delay` until enough latencies
+    are recorded, and it is kept between `min_delay` and `max_delay`.
+    """
+
+    __slots__ = ("percentile", "max_hedges", "initial_delay", "min_delay", "max_delay", "latencies")
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_hedges: int = 1,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        max_delay: float = 5.0,
+        latencies: Optional[LatencyTracker] = None,
+    ):
+        self.percentile = percentile
+        self.max_hedges = max_hedges
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latencies = LatencyTracker() if latencies is None else latencies
+
+    def delay(self) -> float:
+        delay = self.latencies.percentile(self.percentile)
+        if delay is None:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, delay))
+
+
+class CircuitBreaker:
+    """
+    Fail-fast switch of an unhealthy endpoint. After `failure_threshold` consecutive failures the circuit opens and
+    the requests are rejected with `CircuitOpenError`. After `reset_timeout` seconds it is half-open: a single probe
+    request is let through, which closes the circuit if it succeeds, or opens it again if it fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    __slots__ = ("failure_threshold", "reset_timeout", "state", "failures", "_opened_at", "_probing")
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """
+        Whether a request may be made now. In half-open state it admits the probe request.
+        """
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def on_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def on_abort(self):
+        """
+        The request was abandoned (cancelled), it did not tell anything about the health of the endpoint.
+        """
+        self._probing = False
+
+    def on_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+
+class ResiliencePolicy:
+    """
+    Hedging and circuit breaking of the requests to an endpoint, both are optional.
+    The failures are the `IntegrationError`s (other than the invalid signature and rate limiting answers), the
+    connection errors and the timeouts.
+    """
+
+    __slots__ = ("hedge", "breaker")
+
+    def __init__(self, hedge: Optional[HedgePolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.hedge = hedge
+        self.breaker = breaker
+
+    async def call(self, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Make the request (created by the callable for each attempt) with the policies applied.
+        """
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError()
+        try:
+            if self.hedge is None:
+                result = await request()
+            else:
+                result = await self._hedged(request)
+        except (IntegrationError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if self.breaker is not None:
+                if _is_answer(e):
+                    self.breaker.on_success()
+                else:
+                    self.breaker.on_failure()
+            raise
+        except BaseException:
+            if self.breaker is not None:
+                self.breaker.on_abort()
+            raise
+        if self.breaker is not None:
+            self.breaker.on_success()
+        return result
+
+    async def _hedged(self, request: Callable[[], Awaitable[T]]) -> T:
+        hedge = self.hedge
+        delay = hedge.delay()
+        # The latencies are recorded per attempt, the end-to-end latency of the hedged call would shrink the delay.
+        task = asyncio.ensure_future(request())
+        started = {task: time.monotonic()}
+        pending = {task}
+        attempts = 1
+        errors: List[BaseException] = []
+        try:
+            while True:
+                timeout = delay if attempts <= hedge.max_hedges else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None or _is_answer(error):
+                        hedge.latencies.record(time.monotonic() - started[task])
+                    if error is None:
+                        return task.result()
+                    if _is_answer(error):
+                        raise error
+                    errors.append(error)
+                if not done or not pending:
+                    if attempts > hedge.max_hedges:
+                        raise errors[0]
+                    # Slow or failed, another attempt is made.
+                    task = asyncio.ensure_future(request())
+                    started[task] = time.monotonic()
+                    pending.add(task)
+                    attempts += 1
+        finally:
+            for task in pending:
+                # The abandoned slow attempts are recorded with their elapsed time, that is a lower bound.
+                hedge.latencies.record(time.monotonic() - started[task])
+                task.cancel()
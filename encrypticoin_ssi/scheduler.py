@@ -0,0 +1,118 @@
+import random
+import time
+from typing import Optional
+
+
+class ExponentialBackoff:
+    """
+    Exponentially growing retry delay with jitter. The delay is randomized in the upper half of the current step, so
+    the retries of concurrent clients get spread out.
+    """
+
+    __slots__ = ("base", "maximum", "factor", "attempts")
+
+    def __init__(self, base: float = 1.0, maximum: float = 60.0, factor: float = 2.0):
+        self.base = base
+        self.maximum = maximum
+        self.factor = factor
+        self.attempts = 0
+
+    def next_delay(self, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before the next retry. The `retry_after` hint of the server is honored as the minimum.
+        """
+        step = min(self.maximum, self.base * self.factor**self.attempts)
+        self.attempts += 1
+        delay = step / 2 + random.uniform(0, step / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def reset(self):
+        self.attempts = 0
+
+
+class PollScheduler:
+    """
+    Adaptive delay calculation for polling the token changes:
+        - Full pages are followed without delay to catch up with the backlog quickly.
+        - After a partial page the polling continues with `min_interval`, which eases toward `idle_interval` by the
+          `ease` factor while there are no changes.
+        - Rate limiting and errors are retried with exponential backoff.
+    The page size of the server is learned as the largest page seen unless it is configured. Only pages of at least
+    `min_page_size` changes are learned from, so a small first page does not make every small page look full.
+    """
+
+    __slots__ = (
+        "idle_interval",
+        "min_interval",
+        "ease",
+        "page_size",
+        "min_page_size",
+        "backoff",
+        "delay",
+        "_caught_up_at",
+        "_behind",
+    )
+
+    def __init__(
+        self,
+        idle_interval: float = 10.0,
+        min_interval: float = 0.5,
+        ease: float = 2.0,
+        page_size: Optional[int] = None,
+        backoff: Optional[ExponentialBackoff] = None,
+        min_page_size: int = 10,
+    ):
+        self.idle_interval = idle_interval
+        self.min_interval = min_interval
+        self.ease = ease
+        self.page_size = page_size
+        self.min_page_size = min_page_size
+        self.backoff = ExponentialBackoff() if backoff is None else backoff
+        self.delay = 0.0
+        self._caught_up_at = time.monotonic()
+        self._behind = True
+
+    @property
+    def lag(self) -> float:
+        """
+        Seconds since the change stream was last seen fully consumed, or 0 if it is caught up.
+        """
+        if not self._behind:
+            return 0.0
+        return time.monotonic() - self._caught_up_at
+
+    def on_page(self, count: int) -> float:
+        """
+        Delay after a page of `count` changes was retrieved.
+        """
+        self.backoff.reset()
+        if count >= self.min_page_size and (self.page_size is None or count > self.page_size):
+            self.page_size = count
+        if self.page_size is not None and 0 < self.page_size <= count:
+            if not self._behind:
+                self._caught_up_at = time.monotonic()
+                self._behind = True
+            self.delay = 0.0
+        else:
+            self._behind = False
+            if count or not self.delay:
+                self.delay = self.min_interval
+            else:
+                self.delay = min(self.idle_interval, self.delay * self.ease)
+        return self.delay
+
+    def on_backoff(self, retry_after: Optional[float] = None) -> float:
+        """
+        Delay after the server has responded with rate limiting (`BackoffError`).
+        """
+        self.delay = self.backoff.next_delay(retry_after)
+        return self.delay
+
+    def on_error(self) -> float:
+        """
+        Delay after an unexpected error of the query.
+        """
+        self.delay = self.backoff.next_delay()
+        return self.delay
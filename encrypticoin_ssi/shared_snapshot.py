@@ -0,0 +1,368 @@
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.collector import ChangeListener
+from encrypticoin_ssi.storage import ChangeStorage
+from encrypticoin_ssi.wallet_index import BALANCE_SIZE, KEY_SIZE, address_key
+
+MAGIC = b"ESSISNAP"
+VERSION = 1
+
+# magic, version, flags, sequence, capacity, count, decimals, (padding), since, session (-1 for none)
+_HEADER = struct.Struct("<8sIIQQQIIqq")
+_STATE = struct.Struct("<IQ")  # flags and sequence, read together by the readers
+_STATE_OFFSET = 12
+_SEQUENCE = struct.Struct("<Q")
+_SEQUENCE_OFFSET = 16
+_COUNT = struct.Struct("<Q")
+_COUNT_OFFSET = 32
+_CHECKPOINT = struct.Struct("<qq")
+_CHECKPOINT_OFFSET = 48
+
+_STALE = 1  # The file was replaced by a larger one, the readers shall reopen the path.
+
+# Slot: used marker (1 byte, padded to 4), key, balance.
+_KEY_OFFSET = 4
+_BALANCE_OFFSET = _KEY_OFFSET + KEY_SIZE
+SLOT_SIZE = _BALANCE_OFFSET + BALANCE_SIZE
+
+
+def _slot(key: bytes, mask: int) -> int:
+    return int.from_bytes(key[:8], "little") & mask
+
+
+class SnapshotWriter(ChangeListener):
+    """
+    Publisher of the wallet balances into a memory-mapped snapshot file, for `SnapshotReader`s in other processes.
+    It is a `ChangeListener`, so it is kept up-to-date by adding it to the `TokenChangeCollector` (in a single
+    process). The file is an open-addressing hash table of fixed size slots. Each update is enclosed by a sequence
+    lock: the sequence number is odd while the slots are written, so the readers retry lookups that overlapped
+    a write. When the table is filling up, or it is reset or loaded, a new file is built and moved into place, and
+    the old one is marked stale for the readers to reopen the path. Emptied wallets are kept with zero balance until
+    the next rebuild.
+    """
+
+    __slots__ = ("path", "decimals", "_map", "_capacity", "_count")
+
+    def __init__(self, path: str, capacity: int = 65536, decimals: int = 18):
+        """
+        The `capacity` is the initial number of slots (a power of two), an existing snapshot file is reused.
+        """
+        if capacity < 8 or capacity & (capacity - 1):
+            raise ValueError("The capacity must be a power of two (at least 8): %d" % capacity)
+        self.path = path
+        self.decimals = decimals
+        self._map = None
+        try:
+            self._open()
+        except (OSError, ValueError):
+            self._replace(capacity)
+            self._open()
+
+    def _open(self):
+        with open(self.path, "r+b") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        try:
+            magic, version, flags, sequence, capacity, count, decimals, _, _, _ = _HEADER.unpack_from(mm)
+            if magic != MAGIC or version != VERSION or flags & _STALE or decimals != self.decimals:
+                raise ValueError("Incompatible snapshot file: %s" % self.path)
+            if len(mm) != _HEADER.size + capacity * SLOT_SIZE:
+                raise ValueError("Truncated snapshot file: %s" % self.path)
+        except BaseException:
+            mm.close()
+            raise
+        self._map = mm
+        self._capacity = capacity
+        self._count = count
+        if sequence & 1:
+            # An update was interrupted, the content is not reliable.
+            _SEQUENCE.pack_into(mm, _SEQUENCE_OFFSET, sequence + 1)
+            self.reset(None)
+
+    def _create(self, path: str, capacity: int, since: int, session: Optional[int]):
+        with open(path, "w+b") as f:
+            f.truncate(_HEADER.size + capacity * SLOT_SIZE)
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, 0, capacity, 0, self.decimals, 0, since, _pack_session(session)))
+
+    def _replace(self, capacity: int):
+        """
+        Move an empty snapshot file into place of an unusable one. The file is never truncated in place, as the
+        readers may have it mapped. If it is a snapshot of another configuration, it is marked stale for them.
+        """
+        temporary = self.path + ".tmp"
+        self._create(temporary, capacity, 0, None)
+        try:
+            old = open(self.path, "r+b")
+        except OSError:
+            old = None
+        try:
+            os.replace(temporary, self.path)
+            if old is not None and old.read(len(MAGIC)) == MAGIC:
+                old.seek(_STATE_OFFSET)
+                old.write(_STALE.to_bytes(4, "little"))
+        finally:
+            if old is not None:
+                old.close()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._count
+
+    def checkpoint(self) -> Tuple[int, Optional[int]]:
+        """
+        The `since` and `session` of the tracking that the snapshot is consistent with.
+        """
+        since, session = _CHECKPOINT.unpack_from(self._map, _CHECKPOINT_OFFSET)
+        return since, _unpack_session(session)
+
+    def _begin(self):
+        sequence = _SEQUENCE.unpack_from(self._map, _SEQUENCE_OFFSET)[0]
+        _SEQUENCE.pack_into(self._map, _SEQUENCE_OFFSET, sequence + 1)
+
+    def _end(self, since: int, session: Optional[int]):
+        _COUNT.pack_into(self._map, _COUNT_OFFSET, self._count)
+        _CHECKPOINT.pack_into(self._map, _CHECKPOINT_OFFSET, since, _pack_session(session))
+        sequence = _SEQUENCE.unpack_from(self._map, _SEQUENCE_OFFSET)[0]
+        _SEQUENCE.pack_into(self._map, _SEQUENCE_OFFSET, sequence + 1)
+
+    def _put(self, mm: mmap.mmap, mask: int, key: bytes, data: bytes) -> bool:
+        """
+        Write the balance of the key into its slot, returns whether a new slot was taken.
+        """
+        slot = _slot(key, mask)
+        while True:
+            offset = _HEADER.size + slot * SLOT_SIZE
+            if not mm[offset]:
+                mm[offset + _KEY_OFFSET : offset + SLOT_SIZE] = key + data
+                mm[offset] = 1
+                return True
+            if mm[offset + _KEY_OFFSET : offset + _BALANCE_OFFSET] == key:
+                mm[offset + _BALANCE_OFFSET : offset + SLOT_SIZE] = data
+                return False
+            slot = (slot + 1) & mask
+
+    def _items(self) -> Iterable[Tuple[bytes, bytes]]:
+        mm = self._map
+        for slot in range(self._capacity):
+            offset = _HEADER.size + slot * SLOT_SIZE
+            if mm[offset]:
+                key = mm[offset + _KEY_OFFSET : offset + _BALANCE_OFFSET]
+                yield key, mm[offset + _BALANCE_OFFSET : offset + SLOT_SIZE]
+
+    def _rebuild(self, capacity: int, since: int, session: Optional[int], items: Iterable[Tuple[bytes, bytes]]):
+        """
+        Build a new snapshot file of the non-empty items and move it into place. The readers see the old content
+        until they notice the stale flag and reopen the path, so they are never blocked by building the table.
+        """
+        temporary = self.path + ".tmp"
+        self._create(temporary, capacity, since, session)
+        with open(temporary, "r+b") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        empty = bytes(BALANCE_SIZE)
+        count = 0
+        for key, data in items:
+            if data != empty and self._put(mm, capacity - 1, key, data):
+                count += 1
+        _COUNT.pack_into(mm, _COUNT_OFFSET, count)
+        os.replace(temporary, self.path)
+        # The readers that overlap the replacement see the sequence changed and then the stale flag.
+        self._begin()
+        self._map[_STATE_OFFSET : _STATE_OFFSET + 4] = _STALE.to_bytes(4, "little")
+        self._end(*self.checkpoint())
+        self._map.close()
+        self._map = mm
+        self._capacity = capacity
+        self._count = count
+
+    def _fit(self, count: int) -> int:
+        capacity = self._capacity
+        while count * 10 > capacity * 7:
+            capacity *= 2
+        return capacity
+
+    def _grow(self, count: int):
+        self._rebuild(self._fit(count), *self.checkpoint(), self._items())
+
+    def write(self, balances: Dict[bytes, int], since: int, session: Optional[int]):
+        """
+        Update the balances (by binary address key) and the checkpoint in a single consistent step.
+        """
+        data = {key: balance.to_bytes(BALANCE_SIZE, "big") for key, balance in balances.items()}
+        if (self._count + len(data)) * 10 > self._capacity * 7:
+            self._grow(self._count + len(data))
+        mm = self._map
+        mask = self._capacity - 1
+        self._begin()
+        try:
+            for key, value in data.items():
+                if self._put(mm, mask, key, value):
+                    self._count += 1
+        finally:
+            self._end(since, session)
+
+    def apply(self, changes: List[TokenBalanceChange], session: Optional[int]):
+        if not changes:
+            return
+        balances = {}
+        for change in changes:
+            if change.decimals != self.decimals:
+                raise ValueError("Decimals mismatch: %d != %d" % (change.decimals, self.decimals))
+            balances[address_key(change.address)] = int(change.balance)
+        self.write(balances, changes[-1].id + 1, session)
+
+    def reset(self, session: Optional[int]):
+        """
+        Clear all balances and restart the checkpoint from 0 in the new session.
+        """
+        self._rebuild(self._capacity, 0, session, ())
+
+    def load(self, storage: ChangeStorage):
+        """
+        Rebuild the snapshot from the storage if it is not at the same checkpoint, to be called before the collector
+        is started.
+        """
+        checkpoint = storage.load_checkpoint()
+        if checkpoint == self.checkpoint():
+            return
+        balances = {}
+        for address, balance in storage.balances():
+            if balance:
+                balances[address_key(address)] = balance.to_bytes(BALANCE_SIZE, "big")
+        self._rebuild(self._fit(len(balances)), *checkpoint, balances.items())
+
+    async def on_changes(self, changes: List[TokenBalanceChange], session: Optional[int]):
+        self.apply(changes, session)
+
+    async def on_reset(self, session: int):
+        self.reset(session)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class SnapshotReader:
+    """
+    Read-only view of a snapshot file published by a `SnapshotWriter`, it may be used in any number of processes.
+    The lookups are plain memory reads without locking, a lookup that overlapped an update is retried.
+    Note that the consistency check relies on the writes becoming visible in order, as on x86-64.
+    """
+
+    __slots__ = ("path", "threshold", "timeout", "_map", "_mask", "_decimals")
+
+    def __init__(self, path: str, threshold: Optional[int] = None, timeout: float = 1.0):
+        """
+        A wallet has attribution if its balance reaches the `threshold` (one whole token by default).
+        A read raises `TimeoutError` if an update is in progress for `timeout` seconds, as the writer may have died
+        in the middle of it.
+        """
+        self.path = path
+        self.threshold = threshold
+        self.timeout = timeout
+        self._map = None
+        self._open()
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, _, capacity, _, decimals, _, _, _ = _HEADER.unpack_from(mm)
+        if magic != MAGIC or version != VERSION or len(mm) != _HEADER.size + capacity * SLOT_SIZE:
+            mm.close()
+            raise ValueError("Incompatible snapshot file: %s" % self.path)
+        if self._map is not None:
+            self._map.close()
+        self._map = mm
+        self._mask = capacity - 1
+        self._decimals = decimals
+
+    @property
+    def decimals(self) -> int:
+        return self._decimals
+
+    def _read(self, func, *args):
+        retries = 0
+        deadline = None
+        while True:
+            flags, sequence = _STATE.unpack_from(self._map, _STATE_OFFSET)
+            if flags & _STALE:
+                self._open()
+                continue
+            if not sequence & 1:
+                result = func(*args)
+                if _SEQUENCE.unpack_from(self._map, _SEQUENCE_OFFSET)[0] == sequence:
+                    return result
+            retries += 1
+            if retries & 63 == 0:
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self.timeout
+                elif now > deadline:
+                    raise TimeoutError("The snapshot update is not finished: %s" % self.path)
+                time.sleep(0)  # Let the writer finish if it was preempted.
+
+    def _lookup(self, key: bytes) -> Optional[bytes]:
+        mm = self._map
+        mask = self._mask
+        slot = _slot(key, mask)
+        # The probing is bounded, as the slots may be in an inconsistent state during an update.
+        for _ in range(mask + 1):
+            offset = _HEADER.size + slot * SLOT_SIZE
+            if not mm[offset]:
+                return None
+            if mm[offset + _KEY_OFFSET : offset + _BALANCE_OFFSET] == key:
+                return mm[offset + _BALANCE_OFFSET : offset + SLOT_SIZE]
+            slot = (slot + 1) & mask
+        return None
+
+    def get(self, address: str) -> Optional[int]:
+        """
+        The balance of the address in base units, or `None` if it is not in the snapshot.
+        """
+        data = self._read(self._lookup, address_key(address))
+        if data is None:
+            return None
+        return int.from_bytes(data, "big")
+
+    def get_balance(self, address: str) -> Optional[TokenBalance]:
+        value = self.get(address)
+        if value is None:
+            return None
+        return TokenBalance(address, str(value), self._decimals)
+
+    def has_attribution(self, address: str) -> bool:
+        value = self.get(address)
+        if value is None:
+            return False
+        return value >= (10**self._decimals if self.threshold is None else self.threshold)
+
+    def checkpoint(self) -> Tuple[int, Optional[int]]:
+        since, session = self._read(self._header_field, _CHECKPOINT, _CHECKPOINT_OFFSET)
+        return since, _unpack_session(session)
+
+    def __len__(self) -> int:
+        return self._read(self._header_field, _COUNT, _COUNT_OFFSET)[0]
+
+    def _header_field(self, field: struct.Struct, offset: int) -> tuple:
+        return field.unpack_from(self._map, offset)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _pack_session(session: Optional[int]) -> int:
+    return -1 if session is None else session
+
+
+def _unpack_session(session: int) -> Optional[int]:
+    return None if session < 0 else session
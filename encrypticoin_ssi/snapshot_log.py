@@ -0,0 +1,220 @@
+import os
+import struct
+import threading
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.storage import ChangeStorage
+from encrypticoin_ssi.wallet_index import BALANCE_SIZE, KEY_SIZE, WalletBalanceIndex, address_key
+
+SNAPSHOT_MAGIC = b"ESSIBALS"
+LOG_MAGIC = b"ESSICLOG"
+VERSION = 1
+
+# magic, version, decimals, since, session (-1 for none), count; followed by the key and the balance arrays
+_SNAPSHOT_HEADER = struct.Struct("<8sIIqqQ")
+# magic, version, (padding), since and session of the snapshot that the log continues
+_LOG_HEADER = struct.Struct("<8sIIqq")
+# kind, id, key, balance: a change record, or a commit record with the `since` of the page as the id
+_RECORD = struct.Struct("<Bq20s32s")
+_CHANGE = 0
+_COMMIT = 1
+
+
+class SnapshotLogStorage(ChangeStorage):
+    """
+    Change tracking state stored in a directory as a binary snapshot of all balances and an append-only log of the
+    changes applied after it. The balances are kept in memory in a `WalletBalanceIndex`, and loaded with one
+    sequential read of both files, so the start-up time is proportional to the log rather than the history.
+    Each page of changes is appended to the log with a commit record, an incomplete page at the end of the log is
+    discarded when it is loaded. A new snapshot is written when the log has `snapshot_interval` records, and then
+    the log is restarted.
+    The addresses are stored in binary, `balances` restores their checksum format.
+    """
+
+    __slots__ = ("directory", "snapshot_interval", "fsync", "index", "since", "session", "_log", "_records", "_lock")
+
+    def __init__(self, directory: str, decimals: int = 18, snapshot_interval: int = 100000, fsync: bool = False):
+        """
+        With `fsync`, the log is synced to the disk after each page, not only flushed to the operating system.
+        """
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.index = WalletBalanceIndex(decimals)
+        self.since = 0
+        self.session = None
+        self._log: Optional[BinaryIO] = None
+        self._records = 0
+        self._load_snapshot()
+        self._load_log()
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, "balances.snapshot")
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.directory, "changes.log")
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        magic, version, decimals, since, session, count = _SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != VERSION:
+            raise ValueError("Incompatible snapshot file: %s" % self.snapshot_path)
+        keys_end = _SNAPSHOT_HEADER.size + count * KEY_SIZE
+        keys = data[_SNAPSHOT_HEADER.size : keys_end]
+        balances = data[keys_end : keys_end + count * BALANCE_SIZE]
+        self.index = WalletBalanceIndex.restore(keys, balances, decimals)
+        self.since = since
+        self.session = None if session < 0 else session
+
+    def _load_log(self):
+        try:
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        valid = 0
+        if len(data) >= _LOG_HEADER.size:
+            magic, version, _, since, session = _LOG_HEADER.unpack_from(data)
+            if magic != LOG_MAGIC or version != VERSION:
+                raise ValueError("Incompatible log file: %s" % self.log_path)
+            # Otherwise it precedes the snapshot, it was not restarted after it.
+            if since == self.since and session == _pack_session(self.session):
+                valid = self._replay(data)
+        if valid:
+            self._log = open(self.log_path, "r+b")
+            self._log.truncate(valid)
+            self._log.seek(valid)
+        else:
+            self._restart_log()
+
+    def _replay(self, data: bytes) -> int:
+        """
+        Apply the committed pages of the log, returns the size of the committed part.
+        """
+        index = self.index
+        valid = _LOG_HEADER.size
+        records = 0
+        page = []
+        end = _LOG_HEADER.size + (len(data) - _LOG_HEADER.size) // _RECORD.size * _RECORD.size
+        for position, (kind, number, key, value) in enumerate(_RECORD.iter_unpack(data[_LOG_HEADER.size : end])):
+            if kind == _CHANGE:
+                page.append((key, int.from_bytes(value, "big")))
+            elif kind == _COMMIT:
+                for key, balance in page:
+                    address = "0x" + key.hex()
+                    if balance:
+                        index.set(address, balance)
+                    else:
+                        index.remove(address)
+                records += len(page) + 1
+                page.clear()
+                self.since = number
+                valid = _LOG_HEADER.size + (position + 1) * _RECORD.size
+            else:
+                break
+        self._records = records
+        return valid
+
+    def _restart_log(self):
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, "wb")
+        self._log.write(_LOG_HEADER.pack(LOG_MAGIC, VERSION, 0, self.since, _pack_session(self.session)))
+        self._sync()
+        self._records = 0
+
+    def _sync(self):
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+
+    def _write_snapshot(self):
+        keys, balances = self.index.dump()
+        session = _pack_session(self.session)
+        header = _SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, VERSION, self.index.decimals, self.since, session, len(self.index)
+        )
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(header)
+            f.write(keys)
+            f.write(balances)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_path)
+        # The old log is ignored from here on, as its checkpoint does not match the snapshot.
+        self._restart_log()
+
+    def snapshot(self):
+        """
+        Write a new snapshot and restart the log.
+        """
+        with self._lock:
+            self._write_snapshot()
+
+    def load_checkpoint(self) -> Tuple[int, Optional[int]]:
+        with self._lock:
+            return self.since, self.session
+
+    def apply_changes(self, changes: List[TokenBalanceChange], session: Optional[int]):
+        if not changes:
+            return
+        with self._lock:
+            if session != self.session:
+                # The session is only recorded by the snapshot.
+                self.session = session
+                self._write_snapshot()
+            records = []
+            for change in changes:
+                if change.decimals != self.index.decimals:
+                    raise ValueError("Decimals mismatch: %d != %d" % (change.decimals, self.index.decimals))
+                balance = int(change.balance).to_bytes(BALANCE_SIZE, "big")
+                records.append(_RECORD.pack(_CHANGE, change.id, address_key(change.address), balance))
+            since = changes[-1].id + 1
+            records.append(_RECORD.pack(_COMMIT, since, bytes(KEY_SIZE), bytes(BALANCE_SIZE)))
+            self._log.write(b"".join(records))
+            self._sync()
+            self.index.apply(changes)
+            self.since = since
+            self._records += len(records)
+            if self._records >= self.snapshot_interval:
+                self._write_snapshot()
+
+    def reset(self, session: int):
+        with self._lock:
+            self.index = WalletBalanceIndex(self.index.decimals)
+            self.since = 0
+            self.session = session
+            self._write_snapshot()
+
+    def get_balance(self, address: str) -> Optional[TokenBalance]:
+        with self._lock:
+            return self.index.get_balance(address)
+
+    def balances(self) -> Iterator[Tuple[str, int]]:
+        from eth_utils import to_checksum_address
+
+        with self._lock:
+            items = list(self.index.items())
+        for key, balance in items:
+            yield to_checksum_address(key), balance
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+def _pack_session(session: Optional[int]) -> int:
+    return -1 if session is None else session
@@ -0,0 +1,254 @@
+"""
+Local stand-in of the integration API server for offline development, testing and load testing.
+
+    python -m encrypticoin_ssi.standin --port 8080 --changes 1000000
+
+The client can be pointed at it with `ServerIntegrationClient(domain="127.0.0.1:8080", scheme="http")`.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import struct
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+from aiohttp import web
+
+from encrypticoin_ssi.error import SignatureValidationError
+from encrypticoin_ssi.recovery import recover_wallet
+
+_PAIR = struct.Struct("<QQ")
+_INDEX_CHUNK = 250  # Changes indexed between yielding to the event loop.
+
+
+def fixed_latency(seconds: float) -> Callable[[], float]:
+    return lambda: seconds
+
+
+def lognormal_latency(median: float, sigma: float = 0.5, seed: Optional[int] = None) -> Callable[[], float]:
+    """
+    Log-normally distributed latency with the given median, a typical shape of network service latencies.
+    """
+    rnd = random.Random(seed)
+    mu = math.log(median)
+    return lambda: rnd.lognormvariate(mu, sigma)
+
+
+class StandInTIA:
+    """
+    Implementation of the API endpoints with a synthetic, deterministic stream of token balance changes.
+    The `changes` is the number of available changes, it may be increased to simulate new transfers. The changes are
+    generated from the `seed` on demand, for `wallets` distinct addresses, so millions of them do not take memory
+    until the balances are queried.
+    Faults and load can be injected:
+        - `latency` is called for the response delay of each request (see `fixed_latency`, `lognormal_latency`).
+        - `rate_limit_ratio` of the requests are rejected with 429 and the `retry_after` header.
+        - `reset_every` number of `/token-changes` requests the tracking session is reset (also `reset_session`).
+    The addresses are in checksum format like those of the API server, and the `/wallet-by-signed` endpoint recovers
+    the signatures in-process, these require the `recovery` extra.
+    The balances are indexed in the background when the server starts and when the `changes` is increased, in small
+    chunks, so the event loop is not blocked by the indexing.
+    """
+
+    def __init__(
+        self,
+        changes: int = 10000,
+        wallets: int = 1000,
+        page_size: int = 1000,
+        seed: int = 0,
+        decimals: int = 18,
+        latency: Optional[Callable[[], float]] = None,
+        rate_limit_ratio: float = 0.0,
+        retry_after: Optional[float] = 1.0,
+        reset_every: Optional[int] = None,
+    ):
+        self.changes = changes
+        self.wallets = wallets
+        self.page_size = page_size
+        self.seed = seed
+        self.decimals = decimals
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.reset_every = reset_every
+        self.session = 1
+        self.requests: Counter = Counter()
+        self._random = random.Random(seed)
+        self._addresses: Dict[int, str] = {}
+        self._balances: Dict[str, str] = {}  # by lowercase address
+        self._indexed = 0
+        self._indexing: Optional[asyncio.Future] = None
+        self._changes_requests = 0
+
+    def wallet_address(self, wallet: int) -> str:
+        address = self._addresses.get(wallet)
+        if address is None:
+            from eth_utils import to_checksum_address
+
+            digest = hashlib.blake2b(_PAIR.pack(self.seed, wallet), digest_size=20, person=b"wallet").hexdigest()
+            address = self._addresses[wallet] = to_checksum_address("0x" + digest)
+        return address
+
+    def change(self, change_id: int) -> Dict[str, Any]:
+        """
+        The synthetic change by id.
+        """
+        digest = hashlib.blake2b(_PAIR.pack(self.seed, change_id), digest_size=16, person=b"change").digest()
+        address = self.wallet_address(int.from_bytes(digest[:8], "little") % self.wallets)
+        if digest[8] < 16:  # Some wallets are emptied.
+            balance = 0
+        else:
+            balance = int.from_bytes(digest[8:], "little") % (10 ** (self.decimals + 3))
+        return {"id": change_id, "address": address, "balance": str(balance)}
+
+    def _index(self, limit: int):
+        for change_id in range(self._indexed, limit):
+            change = self.change(change_id)
+            self._balances[change["address"].lower()] = change["balance"]
+        self._indexed = max(self._indexed, limit)
+
+    async def _index_changes(self):
+        while self._indexed < self.changes:
+            self._index(min(self.changes, self._indexed + _INDEX_CHUNK))
+            await asyncio.sleep(0)
+
+    async def _update_index(self):
+        if self._indexing is None or self._indexing.done():
+            self._indexing = asyncio.ensure_future(self._index_changes())
+        # A cancelled request shall not stop the indexing for the others.
+        await asyncio.shield(self._indexing)
+
+    def balance(self, address: str) -> str:
+        """
+        The latest balance of the address in the available changes. The pending changes are indexed synchronously.
+        """
+        self._index(self.changes)
+        return self._balances.get(address.lower(), "0")
+
+    def reset_session(self):
+        """
+        Start a new tracking session, the clients have to restart the tracking.
+        """
+        self.session += 1
+
+    def create_app(self, api_path: str = "/tia") -> web.Application:
+        app = web.Application()
+        app.router.add_post(api_path + "/wallet-by-signed", self.wallet_by_signed)
+        app.router.add_post(api_path + "/token-balance", self.token_balance)
+        app.router.add_post(api_path + "/token-changes", self.token_changes)
+        app.router.add_get(api_path + "/contract-info", self.contract_info)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app: web.Application):
+        self.wallet_address(0)  # The checksum implementation is imported before serving.
+        self._indexing = asyncio.ensure_future(self._index_changes())
+
+    async def _on_cleanup(self, app: web.Application):
+        if self._indexing is not None and not self._indexing.done():
+            self._indexing.cancel()
+
+    async def _inject(self, endpoint: str) -> Optional[web.Response]:
+        self.requests[endpoint] += 1
+        if self.latency is not None:
+            delay = self.latency()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if self.rate_limit_ratio and self._random.random() < self.rate_limit_ratio:
+            headers = {} if self.retry_after is None else {"Retry-After": "%g" % self.retry_after}
+            return web.Response(status=429, headers=headers)
+        return None
+
+    async def _json_body(self, request: web.Request) -> Optional[dict]:
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    async def wallet_by_signed(self, request: web.Request) -> web.Response:
+        injected = await self._inject("wallet-by-signed")
+        if injected is not None:
+            return injected
+        body = await self._json_body(request)
+        if body is None:
+            return web.Response(status=400)
+        try:
+            address = recover_wallet(body.get("message"), body.get("signature"))
+        except SignatureValidationError:
+            return web.Response(status=400)
+        return web.json_response({"address": address})
+
+    async def token_balance(self, request: web.Request) -> web.Response:
+        injected = await self._inject("token-balance")
+        if injected is not None:
+            return injected
+        body = await self._json_body(request)
+        if body is None or not isinstance(body.get("address"), str):
+            return web.Response(status=400)
+        # The changes may grow while the index is updated, the synchronous indexing of `balance` would block.
+        while self._indexed < self.changes:
+            await self._update_index()
+        balance = self._balances.get(body["address"].lower(), "0")
+        return web.json_response({"balance": balance, "decimals": self.decimals})
+
+    async def token_changes(self, request: web.Request) -> web.Response:
+        injected = await self._inject("token-changes")
+        if injected is not None:
+            return injected
+        body = await self._json_body(request)
+        if body is None or not isinstance(body.get("since"), int) or body["since"] < 0:
+            return web.Response(status=400)
+        self._changes_requests += 1
+        if self.reset_every and self._changes_requests % self.reset_every == 0:
+            self.reset_session()
+        since = body["since"]
+        page = [self.change(i) for i in range(since, min(self.changes, since + self.page_size))]
+        return web.json_response({"session": self.session, "decimals": self.decimals, "changes": page})
+
+    async def contract_info(self, request: web.Request) -> web.Response:
+        injected = await self._inject("contract-info")
+        if injected is not None:
+            return injected
+        from eth_utils import to_checksum_address
+
+        contract_address = to_checksum_address(
+            "0x" + hashlib.blake2b(_PAIR.pack(self.seed, 0), digest_size=20, person=b"contract").hexdigest()
+        )
+        return web.json_response({"contract_address": contract_address, "block_number": 1, "decimals": self.decimals})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in of the integration API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--api-path", default="/tia")
+    parser.add_argument("--changes", type=int, default=10000)
+    parser.add_argument("--wallets", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-median", type=float, default=0.0, help="seconds, log-normally distributed")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--reset-every", type=int, default=None, help="number of /token-changes requests")
+    args = parser.parse_args()
+    tia = StandInTIA(
+        changes=args.changes,
+        wallets=args.wallets,
+        page_size=args.page_size,
+        seed=args.seed,
+        latency=lognormal_latency(args.latency_median, args.latency_sigma, args.seed) if args.latency_median else None,
+        rate_limit_ratio=args.rate_limit_ratio,
+        retry_after=args.retry_after,
+        reset_every=args.reset_every,
+    )
+    web.run_app(tia.create_app(args.api_path), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
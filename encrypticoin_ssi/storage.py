@@ -0,0 +1,144 @@
+import abc
+import sqlite3
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+
+
+class ChangeStorage(abc.ABC):
+    """
+    Persistent state of the token change tracking: the checkpoint (`since` and `session`) and the latest balance of
+    each crypto-wallet address.
+    """
+
+    __slots__ = ()
+
+    @abc.abstractmethod
+    def load_checkpoint(self) -> Tuple[int, Optional[int]]:
+        """
+        The `since` and `session` values to continue the tracking with.
+        """
+        pass
+
+    @abc.abstractmethod
+    def apply_changes(self, changes: List[TokenBalanceChange], session: Optional[int]):
+        """
+        Record the latest balances and move the checkpoint to `changes[-1].id + 1` atomically.
+        """
+        pass
+
+    @abc.abstractmethod
+    def reset(self, session: int):
+        """
+        Clear all balances and restart the checkpoint from 0 in the new session.
+        """
+        pass
+
+    @abc.abstractmethod
+    def get_balance(self, address: str) -> Optional[TokenBalance]:
+        """
+        The latest recorded balance of the address, if any.
+        """
+        pass
+
+    @abc.abstractmethod
+    def balances(self) -> Iterator[Tuple[str, int]]:
+        """
+        Iterate the (address, balance in base units) pairs of all recorded wallets. The addresses are in checksum
+        format, the same as in the changes of the API.
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteChangeStorage(ChangeStorage):
+    """
+    Change tracking state stored in an SQLite database file. Each page of changes is written in a single transaction.
+    """
+
+    __slots__ = ("path", "_db", "_lock")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoint (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                since INTEGER NOT NULL,
+                session INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS balance (
+                address TEXT PRIMARY KEY,
+                change_id INTEGER NOT NULL,
+                balance TEXT NOT NULL,
+                decimals INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            """)
+
+    def load_checkpoint(self) -> Tuple[int, Optional[int]]:
+        with self._lock:
+            row = self._db.execute("SELECT since, session FROM checkpoint WHERE id = 0").fetchone()
+        if row is None:
+            return 0, None
+        return row[0], row[1]
+
+    def apply_changes(self, changes: List[TokenBalanceChange], session: Optional[int]):
+        if not changes:
+            return
+        # Only the last change of an address in the page needs to be written.
+        latest = {change.address: change for change in changes}
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT INTO balance (address, change_id, balance, decimals) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (address) DO UPDATE SET "
+                    "change_id = excluded.change_id, balance = excluded.balance, decimals = excluded.decimals",
+                    [(c.address, c.id, c.balance, c.decimals) for c in latest.values()],
+                )
+                self._set_checkpoint(changes[-1].id + 1, session)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def reset(self, session: int):
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute("DELETE FROM balance")
+                self._set_checkpoint(0, session)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _set_checkpoint(self, since: int, session: Optional[int]):
+        self._db.execute(
+            "INSERT INTO checkpoint (id, since, session) VALUES (0, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET since = excluded.since, session = excluded.session",
+            (since, session),
+        )
+
+    def get_balance(self, address: str) -> Optional[TokenBalance]:
+        with self._lock:
+            row = self._db.execute("SELECT balance, decimals FROM balance WHERE address = ?", (address,)).fetchone()
+        if row is None:
+            return None
+        return TokenBalance(address, row[0], row[1])
+
+    def balances(self) -> Iterator[Tuple[str, int]]:
+        with self._lock:
+            rows = self._db.execute("SELECT address, balance FROM balance").fetchall()
+        for address, balance in rows:
+            yield address, int(balance)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,144 @@
+import json
+from typing import Any, Dict, List
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+_OBJECT, _FIRST_KEY, _KEY, _COLON, _VALUE, _NEXT_MEMBER, _FIRST_ITEM, _ITEM, _NEXT_ITEM, _END = range(10)
+
+
+class ChangesStreamParser:
+    """
+    Incremental decoder of the `/token-changes` response object.
+    The items of the `changes` array are returned by `feed` as soon as they are decoded, the other members of the
+    object are collected into `header`. Malformed input raises `ValueError`, possibly only when it is closed.
+    """
+
+    __slots__ = ("header", "_buffer", "_pos", "_state", "_key", "_final")
+
+    def __init__(self):
+        self.header: Dict[str, Any] = {}
+        self._buffer = ""
+        self._pos = 0
+        self._state = _OBJECT
+        self._key = None
+        self._final = False
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Process the next piece of the response text and return the newly decoded items of the `changes` array.
+        """
+        if self._pos:
+            self._buffer = self._buffer[self._pos :] + text
+            self._pos = 0
+        else:
+            self._buffer += text
+        items = []
+        while self._step(items):
+            pass
+        return items
+
+    def close(self) -> List[Any]:
+        """
+        Finish the decoding, the response object must be complete.
+        """
+        self._final = True
+        items = self.feed("")
+        if self._state != _END or self._buffer[self._pos :].strip(_WHITESPACE):
+            raise ValueError("Incomplete or malformed token changes response")
+        return items
+
+    def _skip(self) -> bool:
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _expect(self, char: str):
+        if self._buffer[self._pos] != char:
+            raise ValueError("Expected %r at position %d" % (char, self._pos))
+        self._pos += 1
+
+    def _decode(self):
+        """
+        Decode a value, or return `self` if more input is needed.
+        """
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+        except ValueError:
+            if self._final:
+                raise
+            return self
+        # A number (or literal) at the end of the buffer may be incomplete yet.
+        if end == len(self._buffer) and not self._final:
+            return self
+        self._pos = end
+        return value
+
+    def _step(self, items: List[Any]) -> bool:
+        if self._state == _END or not self._skip():
+            return False
+        state = self._state
+        if state == _OBJECT:
+            self._expect("{")
+            self._state = _FIRST_KEY
+        elif state == _FIRST_KEY:
+            if self._buffer[self._pos] == "}":
+                self._pos += 1
+                self._state = _END
+            else:
+                self._state = _KEY
+        elif state == _KEY:
+            key = self._decode()
+            if key is self:
+                return False
+            if not isinstance(key, str):
+                raise ValueError("Invalid object key")
+            self._key = key
+            self._state = _COLON
+        elif state == _COLON:
+            self._expect(":")
+            self._state = _VALUE
+        elif state == _VALUE:
+            if self._key == "changes":
+                self._expect("[")
+                self._state = _FIRST_ITEM
+                return True
+            value = self._decode()
+            if value is self:
+                return False
+            self.header[self._key] = value
+            self._state = _NEXT_MEMBER
+        elif state == _NEXT_MEMBER:
+            char = self._buffer[self._pos]
+            self._pos += 1
+            if char == ",":
+                self._state = _KEY
+            elif char == "}":
+                self._state = _END
+            else:
+                raise ValueError("Expected ',' or '}' at position %d" % (self._pos - 1,))
+        elif state == _FIRST_ITEM:
+            if self._buffer[self._pos] == "]":
+                self._pos += 1
+                self._state = _NEXT_MEMBER
+            else:
+                self._state = _ITEM
+        elif state == _ITEM:
+            item = self._decode()
+            if item is self:
+                return False
+            items.append(item)
+            self._state = _NEXT_ITEM
+        elif state == _NEXT_ITEM:
+            char = self._buffer[self._pos]
+            self._pos += 1
+            if char == ",":
+                self._state = _ITEM
+            elif char == "]":
+                self._state = _NEXT_MEMBER
+            else:
+                raise ValueError("Expected ',' or ']' at position %d" % (self._pos - 1,))
+        return True
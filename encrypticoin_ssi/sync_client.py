@@ -0,0 +1,235 @@
+import http.client
+import queue
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.change_batch import ChangeBatch
+from encrypticoin_ssi.client import ServerIntegrationClient, _JSON_HEADERS, _changes_decimals, _parse_retry_after
+from encrypticoin_ssi.codec import JsonCodec, default_codec
+from encrypticoin_ssi.error import BackoffError, IntegrationError, SignatureValidationError
+
+if TYPE_CHECKING:  # The `eth_account` dependency of the local recovery is slow to import.
+    from encrypticoin_ssi.recovery import LocalSignatureRecovery
+
+Connection = Union[http.client.HTTPConnection, http.client.HTTPSConnection]
+
+# Errors of a pooled connection that the server has closed in the meantime, the request is retried on a new one.
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class SyncServerIntegrationClient:
+    """
+    Synchronous client to the integration REST API for threaded (e.g. WSGI) applications, with the same methods, return
+    types and errors as `ServerIntegrationClient`. It is thread-safe, the keep-alive connections are pooled: at most
+    `pool_size` requests are made concurrently, the others wait for a free connection.
+    Connection failures raise `OSError` or `http.client.HTTPException`, like the `aiohttp.ClientError` of the
+    asynchronous client.
+    """
+
+    __slots__ = (
+        "url_base",
+        "proxy_address",
+        "signature_recovery",
+        "codec",
+        "timeout",
+        "pool_size",
+        "connections_created",
+        "_scheme",
+        "_host",
+        "_port",
+        "_path",
+        "_pool",
+        "_slots",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        domain: str = "etalon.cash",
+        api_path: str = "/tia",
+        proxy_address: Optional[str] = None,
+        signature_recovery: Optional["LocalSignatureRecovery"] = None,
+        codec: Optional[JsonCodec] = None,
+        scheme: str = "https",
+        pool_size: int = 10,
+        timeout: float = 10.0,
+    ):
+        """
+        The `pool_size` shall be the number of the worker threads that use the client.
+        The `proxy_address` is an HTTP proxy URL, HTTPS requests are tunneled through it.
+        """
+        self.url_base = ServerIntegrationClient.create_url_base(domain, api_path, scheme)
+        self.proxy_address = proxy_address
+        self.signature_recovery = signature_recovery
+        self.codec = default_codec() if codec is None else codec
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.connections_created = 0
+        url = urlsplit(self.url_base)
+        self._scheme = url.scheme
+        self._host = url.hostname
+        self._port = url.port
+        self._path = url.path
+        self._pool: "queue.LifoQueue[Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Connection:
+        if self.proxy_address is None:
+            host, port = self._host, self._port
+        else:
+            proxy = urlsplit(self.proxy_address)
+            host, port = proxy.hostname, proxy.port
+        if self._scheme == "https":
+            connection = http.client.HTTPSConnection(host, port, timeout=self.timeout)
+            if self.proxy_address is not None:
+                connection.set_tunnel(self._host, self._port)
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        with self._lock:
+            self.connections_created += 1
+        return connection
+
+    def _request(self, endpoint: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, Optional[str], bytes]:
+        """
+        POST the body to the endpoint, or GET it without a body, on a pooled connection.
+        Returns the status, the `Retry-After` header and the response body.
+        """
+        path = self._path + "/" + endpoint
+        if self.proxy_address is not None and self._scheme == "http":
+            path = self.url_base + "/" + endpoint  # The plain HTTP requests are forwarded by the proxy.
+        data = None if body is None else self.codec.dumps(body)
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    connection = self._pool.get_nowait()
+                    reused = True
+                except queue.Empty:
+                    connection = self._connect()
+                    reused = False
+                try:
+                    if data is None:
+                        connection.request("GET", path)
+                    else:
+                        connection.request("POST", path, data, _JSON_HEADERS)
+                    response = connection.getresponse()
+                    content = response.read()
+                except _STALE_ERRORS:
+                    connection.close()
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    connection.close()
+                    raise
+                if response.will_close:
+                    connection.close()
+                else:
+                    self._pool.put(connection)
+                return response.status, response.getheader("Retry-After"), content
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        Close the idle pooled connections.
+        """
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _loads(self, content: bytes) -> Any:
+        try:
+            return self.codec.loads(content)
+        except (TypeError, ValueError):
+            raise IntegrationError()
+
+    def wallet_by_signed(self, message: str, signature: str) -> str:
+        """
+        See `ServerIntegrationClient.wallet_by_signed`.
+        """
+        if self.signature_recovery is not None:
+            try:
+                return self.signature_recovery.recover(message, signature)
+            except SignatureValidationError:
+                if not self.signature_recovery.remote_fallback:
+                    raise
+        status, retry_after, content = self._request("wallet-by-signed", {"message": message, "signature": signature})
+        if status == 429:
+            raise BackoffError(_parse_retry_after(retry_after))
+        elif status == 400:  # This indicates client error or invalid arguments.
+            raise SignatureValidationError()
+        elif status != 200:
+            raise IntegrationError()
+        result = self._loads(content)
+        if not isinstance(result, dict) or not isinstance(result.get("address"), str):
+            raise IntegrationError()
+        return result["address"]
+
+    def token_balance(self, address: str) -> TokenBalance:
+        """
+        See `ServerIntegrationClient.token_balance`.
+        """
+        status, retry_after, content = self._request("token-balance", {"address": address})
+        if status == 429:
+            raise BackoffError(_parse_retry_after(retry_after))
+        elif status != 200:
+            raise IntegrationError()
+        try:
+            result = self._loads(content)
+            return TokenBalance(address, result["balance"], result["decimals"])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise IntegrationError()
+
+    def _query_changes(self, since: int, session: Optional[int]) -> Tuple[List[Any], int]:
+        status, retry_after, content = self._request("token-changes", {"since": since})
+        if status == 429:
+            raise BackoffError(_parse_retry_after(retry_after))
+        elif status != 200:
+            raise IntegrationError()
+        try:
+            result = self._loads(content)
+            decimals = _changes_decimals(result, session)
+            items = result["changes"]
+            if not isinstance(items, list):
+                raise TypeError()
+            return items, decimals
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise IntegrationError()
+
+    def token_changes(self, since: int, session: Optional[int] = None) -> List[TokenBalanceChange]:
+        """
+        See `ServerIntegrationClient.token_changes`.
+        """
+        items, decimals = self._query_changes(since, session)
+        try:
+            return [TokenBalanceChange(c["id"], c["address"], c["balance"], decimals) for c in items]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise IntegrationError()
+
+    def token_changes_batch(self, since: int, session: Optional[int] = None) -> ChangeBatch:
+        """
+        See `ServerIntegrationClient.token_changes_batch`.
+        """
+        items, decimals = self._query_changes(since, session)
+        try:
+            return ChangeBatch.from_items(items, decimals)
+        except (AttributeError, KeyError, TypeError, ValueError, OverflowError):
+            raise IntegrationError()
+
+    def contract_info(self) -> Dict[str, Any]:
+        """
+        See `ServerIntegrationClient.contract_info`.
+        """
+        status, retry_after, content = self._request("contract-info")
+        if status == 429:
+            raise BackoffError(_parse_retry_after(retry_after))
+        elif status != 200:
+            raise IntegrationError()
+        return self._loads(content)
@@ -0,0 +1,142 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from encrypticoin_ssi.balance import TokenBalance
+
+
+class Tier:
+    """
+    Attribution tier that is reached with a balance of at least `min_balance` base units.
+    """
+
+    __slots__ = ("name", "min_balance")
+
+    def __init__(self, name: str, min_balance: int):
+        self.name = name
+        self.min_balance = min_balance
+
+    def __repr__(self):
+        return "Tier(%r, %d)" % (self.name, self.min_balance)
+
+
+class TierTransition:
+    """
+    Change of the tier of an address. The `change` is the balance that caused it, or `None` on reset.
+    """
+
+    GRANT = "grant"
+    UPGRADE = "upgrade"
+    DOWNGRADE = "downgrade"
+    REVOKE = "revoke"
+
+    __slots__ = ("kind", "address", "old_tier", "new_tier", "change")
+
+    def __init__(
+        self,
+        kind: str,
+        address: str,
+        old_tier: Optional[Tier],
+        new_tier: Optional[Tier],
+        change: Optional[TokenBalance],
+    ):
+        self.kind = kind
+        self.address = address
+        self.old_tier = old_tier
+        self.new_tier = new_tier
+        self.change = change
+
+    def __repr__(self):
+        return "TierTransition(%r, %r, %r, %r)" % (self.kind, self.address, self.old_tier, self.new_tier)
+
+
+class TierTracker:
+    """
+    Rules engine that keeps the current tier of each address from the stream of balance changes and reports only the
+    transitions across the tier boundaries. The addresses without a tier are not kept in memory.
+    When the tracking continues from a checkpoint, the tracker must be seeded with `load` before applying changes.
+    """
+
+    __slots__ = ("tiers", "_thresholds", "_levels")
+
+    def __init__(self, tiers: Iterable[Tier]):
+        self.tiers = sorted(tiers, key=lambda tier: tier.min_balance)
+        if not self.tiers:
+            raise ValueError("At least one tier is required")
+        self._thresholds = [tier.min_balance for tier in self.tiers]
+        if self._thresholds[0] <= 0 or len(set(self._thresholds)) != len(self._thresholds):
+            raise ValueError("Tier thresholds must be positive and unique")
+        self._levels: Dict[str, int] = {}  # address -> index of the tier + 1
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def tier_for(self, balance: int) -> Optional[Tier]:
+        """
+        The tier of a balance in base units.
+        """
+        level = bisect_right(self._thresholds, balance)
+        return self.tiers[level - 1] if level else None
+
+    def current(self, address: str) -> Optional[Tier]:
+        level = self._levels.get(address, 0)
+        return self.tiers[level - 1] if level else None
+
+    def load(self, balances: Iterable[Tuple[str, int]]):
+        """
+        Set the tiers from the persisted (address, balance in base units) pairs, like `ChangeStorage.balances()`,
+        without reporting transitions. It must be called before the changes are processed, to report the transitions
+        of the addresses relative to their persisted balances.
+        """
+        self._levels.clear()
+        thresholds = self._thresholds
+        for address, balance in balances:
+            level = bisect_right(thresholds, balance)
+            if level:
+                self._levels[address] = level
+
+    def process(self, changes: Iterable[TokenBalance]) -> List[TierTransition]:
+        """
+        Apply the balance changes in order and return the resulting tier transitions.
+        """
+        transitions = []
+        levels = self._levels
+        thresholds = self._thresholds
+        for change in changes:
+            old = levels.get(change.address, 0)
+            new = bisect_right(thresholds, change.as_base_units())
+            if old == new:
+                continue
+            if new:
+                levels[change.address] = new
+            else:
+                del levels[change.address]
+            if not old:
+                kind = TierTransition.GRANT
+            elif not new:
+                kind = TierTransition.REVOKE
+            elif new > old:
+                kind = TierTransition.UPGRADE
+            else:
+                kind = TierTransition.DOWNGRADE
+            transitions.append(
+                TierTransition(
+                    kind,
+                    change.address,
+                    self.tiers[old - 1] if old else None,
+                    self.tiers[new - 1] if new else None,
+                    change,
+                )
+            )
+        return transitions
+
+    def reset(self) -> List[TierTransition]:
+        """
+        Forget all tiers, for example on a tracking session reset. The revocations are returned for all the addresses
+        that had a tier, the replayed changes will grant them again.
+        """
+        transitions = [
+            TierTransition(TierTransition.REVOKE, address, self.tiers[level - 1], None, None)
+            for address, level in self._levels.items()
+        ]
+        self._levels.clear()
+        return transitions
@@ -0,0 +1,239 @@
+from array import array
+from typing import Iterable, Iterator, Optional, Tuple
+
+from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi.change_batch import ChangeBatch
+
+KEY_SIZE = 20
+BALANCE_SIZE = 32  # uint256, the same as the token contract
+
+
+def address_key(address: str) -> bytes:
+    """
+    The 20-byte binary key of a crypto-wallet address (checksum or lowercase hexadecimal format).
+    """
+    if len(address) != 2 + 2 * KEY_SIZE or address[:2] not in ("0x", "0X"):
+        raise ValueError("Invalid address: %r" % (address,))
+    return bytes.fromhex(address[2:])
+
+
+class WalletBalanceIndex:
+    """
+    Compact in-memory index of the token balances by crypto-wallet address.
+    The addresses are stored as 20-byte keys and the balances as 32-byte unsigned integers (base units) in contiguous
+    arrays, with an attribution bitmap alongside. An open-addressing hash table maps the keys to the array positions,
+    so the lookup, update and removal are O(1) on average. A wallet has attribution if its balance reaches
+    the `threshold` (one whole token by default).
+    """
+
+    __slots__ = ("decimals", "threshold", "_keys", "_balances", "_flags", "_table", "_count", "_used")
+
+    def __init__(self, decimals: int = 18, threshold: Optional[int] = None):
+        self.decimals = decimals
+        self.threshold = 10**decimals if threshold is None else threshold
+        self._keys = bytearray()
+        self._balances = bytearray()
+        self._flags = bytearray()
+        self._table = array("i", bytes(4 * 8))  # entries: 0 empty, -1 deleted, otherwise position + 1
+        self._count = 0
+        self._used = 0  # occupied and deleted table entries
+
+    @classmethod
+    def restore(cls, keys: bytes, balances: bytes, decimals: int = 18, threshold: Optional[int] = None):
+        """
+        Create the index from the contiguous key and balance arrays of `dump`.
+        """
+        count = len(keys) // KEY_SIZE
+        if len(keys) != count * KEY_SIZE or len(balances) != count * BALANCE_SIZE:
+            raise ValueError("Invalid array sizes: %d, %d" % (len(keys), len(balances)))
+        index = cls(decimals, threshold)
+        index._keys = bytearray(keys)
+        index._balances = bytearray(balances)
+        index._flags = bytearray((count + 7) >> 3)
+        index._count = count
+        threshold = index.threshold
+        for position in range(count):
+            offset = position * BALANCE_SIZE
+            if int.from_bytes(balances[offset : offset + BALANCE_SIZE], "big") >= threshold:
+                index._flags[position >> 3] |= 1 << (position & 7)
+        capacity = 8
+        while count * 3 > capacity:
+            capacity *= 2
+        index._rebuild(capacity)
+        return index
+
+    def dump(self) -> Tuple[bytes, bytes]:
+        """
+        The contiguous key and balance arrays, in the same position order.
+        """
+        return bytes(self._keys), bytes(self._balances)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, address: str) -> bool:
+        return self._find(address_key(address))[1] >= 0
+
+    def _find(self, key: bytes) -> Tuple[int, int]:
+        """
+        The table slot and array position of the key. If it is missing, the position is -1 and the slot is where it
+        shall be inserted.
+        """
+        table = self._table
+        keys = self._keys
+        mask = len(table) - 1
+        slot = int.from_bytes(key[:8], "little") & mask
+        free = -1
+        while True:
+            entry = table[slot]
+            if entry == 0:
+                return (slot if free < 0 else free), -1
+            if entry < 0:
+                if free < 0:
+                    free = slot
+            else:
+                offset = (entry - 1) * KEY_SIZE
+                if keys[offset : offset + KEY_SIZE] == key:
+                    return slot, entry - 1
+            slot = (slot + 1) & mask
+
+    def _rebuild(self, capacity: int):
+        table = array("i", bytes(4 * capacity))
+        mask = capacity - 1
+        keys = self._keys
+        for position in range(self._count):
+            offset = position * KEY_SIZE
+            slot = int.from_bytes(keys[offset : offset + 8], "little") & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = position + 1
+        self._table = table
+        self._used = self._count
+
+    def get(self, address: str) -> Optional[int]:
+        """
+        The balance of the address in base units, or `None` if it is not indexed.
+        """
+        position = self._find(address_key(address))[1]
+        if position < 0:
+            return None
+        offset = position * BALANCE_SIZE
+        return int.from_bytes(self._balances[offset : offset + BALANCE_SIZE], "big")
+
+    def get_balance(self, address: str) -> Optional[TokenBalance]:
+        value = self.get(address)
+        if value is None:
+            return None
+        return TokenBalance(address, str(value), self.decimals)
+
+    def has_attribution(self, address: str) -> bool:
+        position = self._find(address_key(address))[1]
+        if position < 0:
+            return False
+        return bool(self._flags[position >> 3] & (1 << (position & 7)))
+
+    def set(self, address: str, balance: int):
+        """
+        Insert or update the balance of the address in base units.
+        """
+        data = balance.to_bytes(BALANCE_SIZE, "big")  # Raises OverflowError for negative or too large values.
+        key = address_key(address)
+        slot, position = self._find(key)
+        if position < 0:
+            position = self._count
+            if self._table[slot] == 0:
+                self._used += 1
+            self._table[slot] = position + 1
+            self._count += 1
+            self._keys += key
+            self._balances += data
+            if position & 7 == 0:
+                self._flags.append(0)
+            if self._used * 3 > len(self._table) * 2:
+                capacity = len(self._table)
+                while self._count * 3 > capacity:
+                    capacity *= 2
+                self._rebuild(capacity)
+        else:
+            offset = position * BALANCE_SIZE
+            self._balances[offset : offset + BALANCE_SIZE] = data
+        self._set_flag(position, balance >= self.threshold)
+
+    def _set_flag(self, position: int, flag: bool):
+        if flag:
+            self._flags[position >> 3] |= 1 << (position & 7)
+        else:
+            self._flags[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+
+    def remove(self, address: str) -> bool:
+        """
+        Remove the address from the index, returns whether it was present.
+        """
+        slot, position = self._find(address_key(address))
+        if position < 0:
+            return False
+        self._table[slot] = -1
+        last = self._count - 1
+        if position != last:
+            # The last entry is moved into the freed position to keep the arrays contiguous.
+            key = bytes(self._keys[last * KEY_SIZE :])
+            self._keys[position * KEY_SIZE : (position + 1) * KEY_SIZE] = key
+            offset = last * BALANCE_SIZE
+            self._balances[position * BALANCE_SIZE : (position + 1) * BALANCE_SIZE] = self._balances[offset:]
+            self._set_flag(position, bool(self._flags[last >> 3] & (1 << (last & 7))))
+            self._table[self._find_position(key, last)] = position + 1
+        del self._keys[last * KEY_SIZE :]
+        del self._balances[last * BALANCE_SIZE :]
+        self._set_flag(last, False)
+        if last & 7 == 0:
+            del self._flags[-1]
+        self._count = last
+        return True
+
+    def _find_position(self, key: bytes, position: int) -> int:
+        table = self._table
+        mask = len(table) - 1
+        slot = int.from_bytes(key[:8], "little") & mask
+        while table[slot] != position + 1:
+            slot = (slot + 1) & mask
+        return slot
+
+    def apply(self, changes: Iterable[TokenBalance]):
+        """
+        Update the index with the balance changes. Empty wallets are removed to keep the index compact.
+        """
+        for change in changes:
+            if change.decimals != self.decimals:
+                raise ValueError("Decimals mismatch: %d != %d" % (change.decimals, self.decimals))
+            balance = int(change.balance)
+            if balance:
+                self.set(change.address, balance)
+            else:
+                self.remove(change.address)
+
+    def apply_batch(self, batch: ChangeBatch):
+        """
+        Columnar variant of `apply`, without creating the change objects.
+        """
+        if batch.decimals != self.decimals:
+            raise ValueError("Decimals mismatch: %d != %d" % (batch.decimals, self.decimals))
+        for address, balance in zip(batch.addresses, batch.balances):
+            if balance:
+                self.set(address, balance)
+            else:
+                self.remove(address)
+
+    def items(self) -> Iterator[Tuple[bytes, int]]:
+        """
+        Iterate the (key, balance) pairs. The keys are the binary addresses, as the checksum format can not be
+        restored without the Keccak hash function.
+        """
+        for position in range(self._count):
+            offset = position * BALANCE_SIZE
+            yield (
+                bytes(self._keys[position * KEY_SIZE : (position + 1) * KEY_SIZE]),
+                int.from_bytes(self._balances[offset : offset + BALANCE_SIZE], "big"),
+            )
+
+    def attributed_count(self) -> int:
+        return sum(bin(byte).count("1") for byte in self._flags)
@@ -0,0 +1,25 @@
+import pytest
+
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi_tests.fake_tia import FakeTIA
+
+
+@pytest.fixture
+async def fake_tia():
+    tia = FakeTIA()
+    await tia.server.start_server()
+    try:
+        yield tia
+    finally:
+        await tia.server.close()
+
+
+@pytest.fixture
+async def fake_client(fake_tia):
+    client = ServerIntegrationClient()
+    client.url_base = fake_tia.url_base
+    await client.setup()
+    try:
+        yield client
+    finally:
+        await client.close()
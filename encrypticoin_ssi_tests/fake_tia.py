@@ -0,0 +1,86 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+class FakeTIA:
+    """
+    Minimal in-process replacement of the integration API server for offline testing of the client features.
+    """
+
+    def __init__(self):
+        self.session = 1
+        self.decimals = 18
+        self.page_size = 3
+        self.changes: List[Tuple[str, str]] = []
+        self.statuses: List[int] = []  # forced response statuses for the next requests
+        self.retry_after: Optional[str] = None
+        self.changes_body: Optional[str] = None  # raw response body override of `/token-changes`
+        self.requests: List[str] = []
+        self.signer = "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"  # the answer of `/wallet-by-signed`
+        self.delays: List[float] = []  # response delays of the next `/wallet-by-signed` requests
+        app = web.Application()
+        app.router.add_post("/tia/wallet-by-signed", self.wallet_by_signed)
+        app.router.add_post("/tia/token-balance", self.token_balance)
+        app.router.add_post("/tia/token-changes", self.token_changes)
+        app.router.add_get("/tia/contract-info", self.contract_info)
+        self.server = TestServer(app)
+
+    @property
+    def url_base(self) -> str:
+        return str(self.server.make_url("/tia"))
+
+    def add_change(self, address: str, balance: str) -> int:
+        self.changes.append((address, balance))
+        return len(self.changes) - 1
+
+    def _forced(self, request: web.Request) -> Optional[web.Response]:
+        self.requests.append(request.path.rpartition("/")[2])
+        if self.statuses:
+            status = self.statuses.pop(0)
+            if status == 429 and self.retry_after is not None:
+                return web.Response(status=status, headers={"Retry-After": self.retry_after})
+            if status != 200:
+                return web.Response(status=status)
+
+    async def wallet_by_signed(self, request: web.Request) -> web.Response:
+        forced = self._forced(request)
+        if forced is not None:
+            return forced
+        if self.delays:
+            await asyncio.sleep(self.delays.pop(0))
+        if (await request.json())["signature"] == "invalid":
+            return web.Response(status=400)
+        return web.json_response({"address": self.signer})
+
+    async def token_balance(self, request: web.Request) -> web.Response:
+        forced = self._forced(request)
+        if forced is not None:
+            return forced
+        address = (await request.json())["address"]
+        balance = "0"
+        for a, b in self.changes:
+            if a == address:
+                balance = b
+        return web.json_response({"balance": balance, "decimals": self.decimals})
+
+    async def token_changes(self, request: web.Request) -> web.Response:
+        forced = self._forced(request)
+        if forced is not None:
+            return forced
+        if self.changes_body is not None:
+            return web.Response(text=self.changes_body, content_type="application/json")
+        since = (await request.json())["since"]
+        page = [
+            {"id": i, "address": a, "balance": b}
+            for i, (a, b) in enumerate(self.changes[since : since + self.page_size], since)
+        ]
+        return web.json_response({"session": self.session, "decimals": self.decimals, "changes": page})
+
+    async def contract_info(self, request: web.Request) -> web.Response:
+        forced = self._forced(request)
+        if forced is not None:
+            return forced
+        return web.json_response({"contract_address": "0x00", "block_number": 1, "decimals": self.decimals})
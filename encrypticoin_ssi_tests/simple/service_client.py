@@ -6,6 +6,7 @@ class SimpleServiceClientMock:
     def __init__(self, base_url: str = "http://127.0.0.1:8000"):
         self.session = aiohttp.ClientSession(cookie_jar=CookieJar(unsafe=base_url.find("127.0.0.1") >= 0))
         self.base_url = base_url
+        self.message = None
 
     async def close(self):
         await self.session.close()
@@ -13,10 +14,13 @@ class SimpleServiceClientMock:
     async def wallet_challenge(self) -> str:
         async with self.session.post(self.base_url + "/wallet-challenge") as r:
             r.raise_for_status()
-            return (await r.json())["message"]
+            self.message = (await r.json())["message"]
+            return self.message
 
     async def submit_signature(self, signature: str) -> str:
-        async with self.session.post(self.base_url + "/submit-signature", json={"signature": signature}) as r:
+        async with self.session.post(
+            self.base_url + "/submit-signature", json={"message": self.message, "signature": signature}
+        ) as r:
             r.raise_for_status()
             return (await r.json())["address"]
 
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.broadcast import ChangeBroadcaster, SessionReset, Subscription
+from encrypticoin_ssi.collector import TokenChangeCollector
+from encrypticoin_ssi.storage import SQLiteChangeStorage
+
+
+def _changes(*addresses: str):
+    return [TokenBalanceChange(i, address, str(i), 18) for i, address in enumerate(addresses)]
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_policies():
+    broadcaster = ChangeBroadcaster()
+    blocking = broadcaster.subscribe(2, Subscription.BLOCK)
+    dropping = broadcaster.subscribe(2, Subscription.DROP_OLDEST)
+    coalescing = broadcaster.subscribe(2, Subscription.COALESCE)
+    publish = asyncio.create_task(broadcaster.on_changes(_changes("0xA", "0xB", "0xA", "0xC"), 1))
+    await asyncio.sleep(0.01)
+    assert not publish.done()  # the blocking subscriber applies backpressure
+    assert blocking.pending == 2 and blocking.lag > 0
+    assert (await blocking.get()).id == 0
+    await asyncio.sleep(0.01)
+    assert not publish.done()
+    assert [(await blocking.get()).id for _ in range(2)] == [1, 2]
+    await publish
+    assert (await blocking.get()).id == 3
+    blocking.close()
+    assert blocking.closed
+
+    assert [c.id for c in [await dropping.get(), await dropping.get()]] == [2, 3]
+    assert dropping.dropped == 2
+    assert [(c.address, c.id) for c in [await coalescing.get(), await coalescing.get()]] == [("0xB", 1), ("0xC", 3)]
+    assert (coalescing.coalesced, coalescing.dropped) == (1, 1)
+
+    await broadcaster.on_changes(_changes("0xA"), 1)
+    await broadcaster.on_reset(2)
+    await broadcaster.on_changes(_changes("0xA"), 1)
+    assert dropping.pending == 2
+    items = [await coalescing.get(), await coalescing.get()]
+    assert isinstance(items[0], SessionReset) and items[0].session == 2
+    assert items[1].address == "0xA"  # the change of the previous session was dropped, not coalesced
+
+    dropping.close()
+    assert broadcaster.subscriptions == [coalescing]
+    assert [item async for item in dropping][0].session == 2
+    assert [item async for item in blocking] == []
+    broadcaster.close()
+    assert broadcaster.subscriptions == []
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_reset_overflow():
+    broadcaster = ChangeBroadcaster()
+    blocking = broadcaster.subscribe(1, Subscription.BLOCK)
+    subscriptions = [
+        broadcaster.subscribe(2, overflow) for overflow in (Subscription.DROP_OLDEST, Subscription.COALESCE)
+    ]
+    await broadcaster.on_changes(_changes("0xA"), 1)
+    publish = asyncio.create_task(broadcaster.on_changes(_changes("0xB", "0xC"), 1))
+    await asyncio.sleep(0.01)
+    assert not publish.done()  # the full blocking subscriber does not hold back the others
+    assert [subscription.pending for subscription in subscriptions] == [2, 2]
+    blocking.close()
+    await publish
+
+    await broadcaster.on_reset(2)
+    await broadcaster.on_changes(_changes("0xD", "0xE", "0xF"), 2)
+    for subscription in subscriptions:
+        items = [await subscription.get() for _ in range(subscription.pending)]
+        assert isinstance(items[0], SessionReset) and items[0].session == 2
+        assert [item.address for item in items[1:]] == ["0xF"]
+
+
+@pytest.mark.asyncio
+async def test_collector_broadcast(fake_tia, fake_client, tmp_path):
+    for i in range(4):
+        fake_tia.add_change("0xA%d" % i, str(i))
+    broadcaster = ChangeBroadcaster()
+    subscription = broadcaster.subscribe(10)
+    storage = SQLiteChangeStorage(str(tmp_path / "tracking.sqlite3"))
+    collector = TokenChangeCollector(fake_client, storage)
+    collector.add_listener(broadcaster)
+    await collector.collect()
+    await collector.collect()
+    items = [await subscription.get() for _ in range(5)]
+    assert isinstance(items[0], SessionReset)
+    assert [c.id for c in items[1:]] == [0, 1, 2, 3]
+    storage.close()
+
+
+def test_broadcaster_loop():
+    broadcaster = ChangeBroadcaster()
+    subscription = broadcaster.subscribe(1)  # created outside of the event loop
+
+    async def deliver():
+        publish = asyncio.ensure_future(broadcaster.on_changes(_changes("0xA", "0xB"), 1))
+        assert [(await subscription.get()).address for _ in range(2)] == ["0xA", "0xB"]
+        await publish
+
+    asyncio.run(deliver())
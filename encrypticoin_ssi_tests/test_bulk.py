@@ -0,0 +1,34 @@
+import pytest
+
+from encrypticoin_ssi.bulk import SharedBackoff
+from encrypticoin_ssi.error import IntegrationError
+from encrypticoin_ssi.scheduler import ExponentialBackoff
+
+
+@pytest.mark.asyncio
+async def test_token_balances(fake_tia, fake_client):
+    addresses = ["0xA%d" % i for i in range(20)]
+    for i, address in enumerate(addresses):
+        fake_tia.add_change(address, str(i))
+    fake_tia.statuses = [429, 429, 200, 500]
+    backoff = SharedBackoff(ExponentialBackoff(base=0.01))
+    results = {}
+    async for address, result in fake_client.token_balances(iter(addresses), concurrency=4, backoff=backoff):
+        results[address] = result
+    assert set(results) == set(addresses)
+    errors = [a for a, r in results.items() if isinstance(r, IntegrationError)]
+    assert len(errors) == 1
+    for address in addresses:
+        if address not in errors:
+            assert results[address].balance == str(addresses.index(address))
+    assert fake_tia.requests.count("token-balance") == 22  # the rate limited queries are retried
+    assert backoff.backoff.attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_token_balances_break(fake_tia, fake_client):
+    balances = fake_client.token_balances(("0xA%d" % i for i in range(100)), concurrency=2)
+    async for address, result in balances:
+        break
+    await balances.aclose()
+    assert fake_tia.requests.count("token-balance") < 10
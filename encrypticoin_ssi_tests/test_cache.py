@@ -0,0 +1,48 @@
+import asyncio
+import traceback
+
+import pytest
+
+from encrypticoin_ssi.cache import BalanceCache, TTLCache
+from encrypticoin_ssi.error import BackoffError, IntegrationError
+
+
+def test_ttl_cache():
+    cache = TTLCache(2)
+    cache.put("a", 1, ttl=60)
+    cache.put("b", 2, ttl=-1)  # already expired
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert "b" not in cache
+    assert cache.pop("a") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_balance_cache(fake_tia, fake_client):
+    cache = fake_client.balance_cache = BalanceCache(ttl=0.1, max_size=2, error_ttl=0.1)
+    fake_tia.add_change("0xA0", "5")
+    balances = await asyncio.gather(*(fake_client.token_balance("0xA0") for _ in range(5)))
+    assert [b.balance for b in balances] == ["5"] * 5
+    assert fake_tia.requests == ["token-balance"]
+    assert (cache.hits, cache.misses, cache.coalesced) == (0, 5, 4)
+    assert (await fake_client.token_balance("0xA0")).balance == "5"
+    assert cache.hits == 1
+
+    fake_tia.statuses = [500]
+    for _ in range(20):
+        with pytest.raises(IntegrationError) as e:
+            await fake_client.token_balance("0xA1")
+        assert len(traceback.extract_tb(e.value.__traceback__)) < 10  # the traceback does not grow on the hits
+    assert fake_tia.requests.count("token-balance") == 2  # the error is cached
+    fake_tia.statuses = [429]
+    with pytest.raises(BackoffError):
+        await fake_client.token_balance("0xA3")
+    assert fake_tia.requests.count("token-balance") == 3
+    assert "0xA3" not in cache._cache  # rate limiting is not cached
+    await fake_client.token_balance("0xA2")
+    assert len(cache) == 2
+
+    await asyncio.sleep(0.1)
+    assert (await fake_client.token_balance("0xA1")).balance == "0"
+    assert fake_tia.requests.count("token-balance") == 5
@@ -0,0 +1,51 @@
+import pytest
+
+from encrypticoin_ssi.change_batch import ChangeBatch
+from encrypticoin_ssi.error import IntegrationError, TrackingSessionReset
+from encrypticoin_ssi.wallet_index import WalletBalanceIndex
+
+
+def test_change_batch():
+    batch = ChangeBatch.from_items(
+        [{"id": 5, "address": "0xA0", "balance": "1250"}, {"id": 7, "address": "0xA1", "balance": "0"}], 2
+    )
+    assert len(batch) == 2
+    assert list(batch.ids) == [5, 7]
+    assert batch.balances == [1250, 0]
+    assert batch.last_id == 7
+    assert batch.next_since(0) == 8
+    change = batch[0]
+    assert (change.id, change.address, change.balance, change.decimals) == (5, "0xA0", "1250", 2)
+    assert [c.as_integer() for c in batch] == [12, 0]
+    empty = ChangeBatch.from_items([], 18)
+    assert empty.last_id is None
+    assert empty.next_since(3) == 3
+    for malformed in ([{"id": 1, "address": "0xA0"}], [{"id": "1", "address": "0xA0", "balance": "1"}], [1]):
+        with pytest.raises((KeyError, TypeError, ValueError)):
+            ChangeBatch.from_items(malformed, 18)
+
+
+@pytest.mark.asyncio
+async def test_token_changes_batch(fake_tia, fake_client):
+    addresses = ["0x%040x" % i for i in range(5)]
+    for i, address in enumerate(addresses):
+        fake_tia.add_change(address, str(i * 10**18))
+    index = WalletBalanceIndex(18)
+    since = 0
+    while True:
+        batch = await fake_client.token_changes_batch(since, 1)
+        if not batch:
+            break
+        index.apply_batch(batch)
+        since = batch.next_since(since)
+    assert since == 5
+    assert len(index) == 4  # the empty wallet is not indexed
+    assert index.get(addresses[3]) == 3 * 10**18
+    with pytest.raises(TrackingSessionReset):
+        await fake_client.token_changes_batch(0, None)
+    fake_tia.changes_body = '{"session": 1, "decimals": 18, "changes": [{"id": 0, "address": "0xA0", "balance": "x"}]}'
+    with pytest.raises(IntegrationError):
+        await fake_client.token_changes_batch(0, 1)
+    fake_tia.changes_body = '{"session": 1, "decimals": 18, "changes": {}}'
+    with pytest.raises(IntegrationError):
+        await fake_client.token_changes(0, 1)
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi.codec import ORJSON_CODEC, STDLIB_CODEC, JsonCodec, default_codec
+from encrypticoin_ssi.error import IntegrationError
+
+
+def test_codecs():
+    assert default_codec() is (ORJSON_CODEC or STDLIB_CODEC)
+    value = {"since": 10, "address": "0xÁ", "changes": [{"balance": "1"}]}
+    for codec in (STDLIB_CODEC, ORJSON_CODEC):
+        if codec is None:
+            continue
+        assert isinstance(codec.dumps(value), bytes)
+        assert json.loads(codec.dumps(value)) == value
+        assert codec.loads(json.dumps(value).encode("utf-8")) == value
+        with pytest.raises(ValueError):
+            codec.loads(b"{")
+
+
+@pytest.mark.asyncio
+async def test_client_codec(fake_tia):
+    calls = []
+
+    def loads(data: bytes):
+        calls.append("loads")
+        return json.loads(data)
+
+    def dumps(obj) -> bytes:
+        calls.append("dumps")
+        return json.dumps(obj).encode("utf-8")
+
+    tia = ServerIntegrationClient(codec=JsonCodec("test", loads, dumps))
+    tia.url_base = fake_tia.url_base
+    await tia.setup()
+    try:
+        fake_tia.add_change("0xA0", "7")
+        assert (await tia.token_balance("0xA0")).balance == "7"
+        assert [c.id for c in await tia.token_changes(0, 1)] == [0]
+        assert calls == ["dumps", "loads"] * 2
+        fake_tia.changes_body = "{"
+        with pytest.raises(IntegrationError):
+            await tia.token_changes(0, 1)
+    finally:
+        await tia.close()
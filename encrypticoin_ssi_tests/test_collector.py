@@ -0,0 +1,45 @@
+import pytest
+
+from encrypticoin_ssi.collector import TokenChangeCollector
+from encrypticoin_ssi.storage import ChangeStorage, SQLiteChangeStorage
+
+
+@pytest.mark.asyncio
+async def test_collector_checkpoint(fake_tia, fake_client, tmp_path):
+    path = str(tmp_path / "tracking.sqlite3")
+    for i in range(7):
+        fake_tia.add_change("0xA%d" % (i % 4), str(i * 10**18))
+    storage = SQLiteChangeStorage(path)
+    collector = TokenChangeCollector(fake_client, storage)
+    assert [c.id for c in await collector.collect()] == [0, 1, 2]  # session reset from None, then first page
+    assert (collector.since, collector.session) == (3, 1)
+    assert len(await collector.collect()) == 3
+    storage.close()
+
+    # Continue from the checkpoint after a restart.
+    storage = SQLiteChangeStorage(path)
+    collector = TokenChangeCollector(fake_client, storage)
+    assert [c.id for c in await collector.collect()] == [6]
+    assert await collector.collect() == []
+    assert storage.load_checkpoint() == (7, 1)
+    assert storage.get_balance("0xA2").balance == str(6 * 10**18)
+    assert storage.get_balance("0xA0").as_integer() == 4
+    assert storage.get_balance("0xB0") is None
+
+    # Session reset clears the storage.
+    fake_tia.session = 2
+    fake_tia.changes = [("0xB0", "1")]
+    assert [c.address for c in await collector.collect()] == ["0xB0"]
+    assert storage.load_checkpoint() == (1, 2)
+    assert storage.get_balance("0xA0") is None
+    assert storage.get_balance("0xB0").balance == "1"
+    storage.close()
+
+
+def test_storage_interface():
+    class Incomplete(ChangeStorage):
+        def load_checkpoint(self):
+            return 0, None
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,38 @@
+import pytest
+
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi.connection import ConnectionSettings
+
+
+@pytest.mark.asyncio
+async def test_connection_settings(fake_tia):
+    settings = ConnectionSettings(limit_per_host=4, keepalive_timeout=10.0, total_timeout=3.0)
+    tia = ServerIntegrationClient(connection=settings)
+    tia.url_base = fake_tia.url_base
+    await tia.setup()
+    try:
+        assert tia.session.connector.limit_per_host == 4
+        assert tia.session.timeout.total == 3.0
+        assert await tia.warm_up(3) == 3
+        assert fake_tia.requests == ["contract-info"] * 3
+        fake_tia.statuses = [500]
+        assert await tia.warm_up(2) == 1
+    finally:
+        await tia.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_connector(fake_tia):
+    connector = ConnectionSettings().create_connector()
+    clients = [ServerIntegrationClient(connection=ConnectionSettings(connector=connector)) for _ in range(2)]
+    for tia in clients:
+        tia.url_base = fake_tia.url_base
+        await tia.setup()
+        assert tia.session.connector is connector
+        assert (await tia.contract_info())["decimals"] == 18
+    await clients[0].close()
+    assert not connector.closed
+    assert (await clients[1].contract_info())["decimals"] == 18
+    await clients[1].close()
+    assert not connector.closed
+    await connector.close()
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from encrypticoin_ssi.collector import TokenChangeCollector
+from encrypticoin_ssi.error import TrackingSessionReset
+from encrypticoin_ssi.scheduler import ExponentialBackoff, PollScheduler
+from encrypticoin_ssi.storage import SQLiteChangeStorage
+
+
+def _scheduler() -> PollScheduler:
+    return PollScheduler(idle_interval=0.02, min_interval=0.01, backoff=ExponentialBackoff(base=0.01))
+
+
+@pytest.mark.asyncio
+async def test_follow_changes(fake_tia, fake_client):
+    for i in range(7):
+        fake_tia.add_change("0xA%d" % i, "1")
+    fake_tia.statuses = [200, 429, 500]
+    async with fake_client.follow_changes(0, 1, scheduler=_scheduler()) as pages:
+        assert [c.id for c in await pages.__anext__()] == [0, 1, 2]
+        await asyncio.sleep(0.1)
+        assert fake_tia.requests.count("token-changes") >= 4  # next page prefetched after the retries
+        assert [c.id for c in await pages.__anext__()] == [3, 4, 5]
+        assert [c.id for c in await pages.__anext__()] == [6]
+        assert pages.since == 7
+        fake_tia.add_change("0xB0", "2")
+        assert [c.address for c in await pages.__anext__()] == ["0xB0"]
+        fake_tia.session = 2
+        with pytest.raises(TrackingSessionReset):
+            await pages.__anext__()
+        with pytest.raises(StopAsyncIteration):
+            await pages.__anext__()
+    assert pages._task.done()
+
+
+@pytest.mark.asyncio
+async def test_follow_changes_cancel(fake_tia, fake_client):
+    pages = fake_client.follow_changes(0, 1, scheduler=_scheduler())
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(pages.__anext__(), 0.05)  # no changes to yield
+    fake_tia.add_change("0xA0", "1")
+    assert [c.id for c in await pages.__anext__()] == [0]
+    await pages.aclose()
+    assert pages._task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_follow_changes_break(fake_tia, fake_client):
+    fake_tia.add_change("0xA0", "1")
+    async with fake_client.follow_changes(0, 1, scheduler=_scheduler()) as pages:
+        async for changes in pages:
+            assert [c.id for c in changes] == [0]
+            break
+    assert pages._task.cancelled()
+    await asyncio.sleep(0.01)  # a request sent before the cancellation may still arrive
+    requests = len(fake_tia.requests)
+    await asyncio.sleep(0.1)
+    assert len(fake_tia.requests) == requests
+
+    pages = fake_client.follow_changes(1, 1, scheduler=_scheduler())
+
+    async def consume():
+        async with pages:
+            async for _ in pages:
+                pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert pages._task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_collector_run(fake_tia, fake_client, tmp_path):
+    for i in range(7):
+        fake_tia.add_change("0xA%d" % i, str(i))
+    storage = SQLiteChangeStorage(str(tmp_path / "tracking.sqlite3"))
+    collector = TokenChangeCollector(fake_client, storage, _scheduler())
+    task = asyncio.create_task(collector.run())
+    try:
+        await asyncio.sleep(0.2)
+        assert storage.load_checkpoint() == (7, 1)
+        fake_tia.session = 2
+        fake_tia.changes = [("0xB0", "1")]
+        await asyncio.sleep(0.2)
+        assert storage.load_checkpoint() == (1, 2)
+        assert storage.get_balance("0xA0") is None
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        storage.close()
@@ -0,0 +1,50 @@
+import pytest
+
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi.error import BackoffError
+from encrypticoin_ssi.metrics import ClientMetrics, Histogram, MetricsSink, prometheus_text
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert (histogram.count, histogram.sum) == (4, 2.65)
+
+
+@pytest.mark.asyncio
+async def test_client_metrics(fake_tia):
+    class Sink(MetricsSink):
+        families = None
+
+        def export(self, families):
+            Sink.families = families
+
+    metrics = ClientMetrics()
+    client = ServerIntegrationClient(metrics=metrics)
+    client.url_base = fake_tia.url_base
+    await client.setup()
+    try:
+        await client.contract_info()
+        await client.token_balance("0xA")
+        fake_tia.statuses = [429]
+        with pytest.raises(BackoffError):
+            await client.token_balance("0xA")
+    finally:
+        await client.close()
+    assert metrics.statuses == {("contract-info", 200): 1, ("token-balance", 200): 1, ("token-balance", 429): 1}
+    assert metrics.in_flight == {"contract-info": 0, "token-balance": 0}
+    assert metrics.latency[("token-balance", "total")].count == 2
+    assert metrics.latency[("contract-info", "ttfb")].count == 1
+    assert metrics.latency[("contract-info", "connect")].count == 1
+    assert metrics.connections_created == 1 and metrics.reuse_ratio == 2 / 3
+    assert metrics.bytes_sent["token-balance"] == 2 * len(b'{"address":"0xA"}')
+    assert metrics.bytes_received["contract-info"] > 0
+
+    metrics.export(Sink())
+    text = prometheus_text(Sink.families)
+    assert "# TYPE tia_client_request_duration_seconds histogram\n" in text
+    assert 'tia_client_responses_total{endpoint="token-balance",status="429"} 1\n' in text
+    assert 'tia_client_request_duration_seconds_bucket{endpoint="token-balance",phase="total",le="+Inf"} 2\n' in text
+    assert 'tia_client_connections_total{kind="reused"} 2\n' in text
@@ -2,10 +2,12 @@ from decimal import Decimal
 
 import pytest
 
-from encrypticoin_ssi.balance import TokenBalance
+from encrypticoin_ssi import balance
+from encrypticoin_ssi.balance import TokenBalance, attribution_flags
 from encrypticoin_ssi.balance_change import TokenBalanceChange
 from encrypticoin_ssi.client import ServerIntegrationClient
-from encrypticoin_ssi.message import ProofMessageFactory
+from encrypticoin_ssi.error import ChallengeError, ChallengeExpired, ChallengeReplayed
+from encrypticoin_ssi.message import ProofMessageFactory, UsedNonceRegistry
 
 
 def test_token_balance_object():
@@ -43,6 +45,40 @@ def test_token_balance_object():
     assert issubclass(TokenBalanceChange, TokenBalance)
 
 
+def test_token_balance_fast_paths():
+    tb = TokenBalance("addr", "1500", 3)
+    assert tb.as_base_units() == 1500
+    assert tb.has_attribution() is True
+    assert tb.has_attribution(1501) is False
+    assert tb.has_attribution(0) is True
+    tb.balance = "999"
+    assert tb.as_base_units() == 999
+    assert tb.has_attribution() is False
+    assert tb.as_integer() == 0
+    tb = TokenBalance("addr", "42", 0)
+    assert tb.as_integer() == 42
+    assert tb.as_float() == 42.0
+    tb = TokenBalanceChange(1, "addr", "0012", 1)
+    assert tb.as_integer() == 1
+    assert tb.id == 1
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_attribution_flags(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(balance, "numpy", None)
+    values = ["0", "1", "99", "100", "101", "0100", "1000", "099", "5" * 40, "-500", "+500", " 99", "1_000"] * 10
+    balances = [TokenBalance("addr", v, 2) for v in values]
+    assert attribution_flags(balances) == [tb.has_attribution() for tb in balances]
+    assert attribution_flags(balances, 101) == [int(v) >= 101 for v in values]
+    assert attribution_flags(balances, 0) == [int(v) >= 0 for v in values]
+    assert attribution_flags([]) == []
+    with pytest.raises(ValueError):
+        attribution_flags(balances + [TokenBalance("addr", "1", 3)])
+
+
 def test_message_factory():
     desc = "Wallet ownership proof for token attribution by linking to account at XY Company."
     pmf = ProofMessageFactory(desc)
@@ -66,3 +102,46 @@ async def test_contract_info():
         assert info["decimals"] == 18
     finally:
         await tia.close()
+
+
+def test_message_challenge():
+    pmf = ProofMessageFactory("desc", secret_key=b"k" * 32, max_ttl=60, used_nonces=UsedNonceRegistry(resolution=10))
+    message_id = pmf.create_challenge("session-a", ttl=30, now=1000)
+    assert pmf.extract_id(pmf.create(message_id)) == message_id
+    assert message_id.split("-")[0] == "1030"
+    with pytest.raises(ChallengeError):
+        pmf.verify_challenge(message_id, "session-b", now=1001)
+    with pytest.raises(ChallengeError):
+        ProofMessageFactory("desc", secret_key=b"x" * 32).verify_challenge(message_id, "session-a", now=1001)
+    with pytest.raises(ChallengeError):
+        pmf.verify_challenge("1030-00-" + message_id.split("-")[2], "session-a", now=1001)
+    with pytest.raises(ChallengeError):
+        pmf.verify_challenge("garbage", "session-a", now=1001)
+    with pytest.raises(ChallengeExpired):
+        pmf.verify_challenge(message_id, "session-a", now=1031)
+    pmf.verify_challenge(message_id, "session-a", now=1001)
+    with pytest.raises(ChallengeReplayed):
+        pmf.verify_challenge(message_id, "session-a", now=1002)
+    assert len(pmf.used_nonces) == 1
+
+    # The used nonces are dropped in bulk by expiry buckets.
+    for now in (1005, 1015, 1025):
+        pmf.verify_challenge(pmf.create_challenge("session-a", ttl=30, now=now), "session-a", now=now)
+    assert len(pmf.used_nonces) == 4
+    pmf.verify_challenge(pmf.create_challenge("session-a", ttl=60, now=1050), "session-a", now=1050)
+    assert len(pmf.used_nonces) == 2
+    pmf.verify_challenge(pmf.create_challenge("session-a", ttl=60, now=1070), "session-a", now=1070)
+    assert len(pmf.used_nonces) == 2
+
+    # A full registry drops the earliest expiring bucket instead of rejecting the challenges.
+    pmf.used_nonces.max_nonces = 2
+    for _ in range(3):
+        latest = pmf.create_challenge("session-a", ttl=60, now=1070)
+        pmf.verify_challenge(latest, "session-a", now=1070)
+    assert len(pmf.used_nonces) == 2
+    with pytest.raises(ChallengeReplayed):
+        pmf.verify_challenge(latest, "session-a", now=1071)
+    with pytest.raises(ValueError):
+        pmf.create_challenge("session-a", ttl=61)
+    with pytest.raises(ValueError):
+        ProofMessageFactory("desc").create_challenge("session-a")
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import pytest
+
+from encrypticoin_ssi.error import BackoffError
+from encrypticoin_ssi.rate_limit import RateLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket():
+    bucket = TokenBucket(200, burst=2)
+    order = []
+
+    async def request(i: int):
+        await bucket.acquire()
+        order.append(i)
+
+    started = time.monotonic()
+    await asyncio.gather(*(request(i) for i in range(12)))
+    assert order == list(range(12))
+    assert 0.04 < time.monotonic() - started < 0.5  # 2 in the burst, then 10 at 200/s
+
+    bucket.on_backoff(0.05)
+    bucket.on_backoff()  # the same burst of rejections
+    assert bucket.rate == 100 and bucket.tokens < 1
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.05
+    for _ in range(10):
+        bucket.on_success()
+    assert 100 < bucket.rate < 101
+    bucket.rate = 199.999
+    bucket.on_success()
+    assert bucket.rate == 200
+
+
+def test_rate_limiter():
+    shared = RateLimiter.shared(10)
+    assert shared.bucket("token-balance") is shared.bucket("contract-info")
+    separate = RateLimiter.per_endpoint(10)
+    assert separate.bucket("token-balance") is not separate.bucket("contract-info")
+    assert RateLimiter({"token-changes": TokenBucket(1)}).bucket("token-balance") is None
+    with pytest.raises(ValueError):
+        RateLimiter({"token_balance": TokenBucket(1)})
+
+
+def test_token_bucket_loop():
+    bucket = TokenBucket(1000)  # created outside of the event loop, like a module-level client
+
+    async def contend():
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+
+    asyncio.run(contend())
+
+
+@pytest.mark.asyncio
+async def test_client_rate_limit(fake_tia, fake_client):
+    fake_client.rate_limiter = RateLimiter.per_endpoint(1000, burst=5)
+    fake_tia.statuses = [200, 429]
+    fake_tia.retry_after = "0"
+    await fake_client.contract_info()
+    with pytest.raises(BackoffError):
+        await fake_client.token_balance("0xA")
+    assert fake_client.rate_limiter.bucket("token-balance").rate == 500
+    assert fake_client.rate_limiter.bucket("contract-info").rate == 1000
+    assert (await fake_client.token_changes(0, 1)) == []
@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from encrypticoin_ssi.cache import LRUCache
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi.error import SignatureValidationError
+from encrypticoin_ssi.recovery import LocalSignatureRecovery, recover_wallet
+
+
+def _sign(wallet, message: str) -> str:
+    return wallet.sign_message(encode_defunct(text=message)).signature.hex()
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b" as "a" was used recently
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_recover_wallet():
+    wallet = Account.create()
+    message = "Test proof\nId: 1"
+    signature = _sign(wallet, message)
+    assert recover_wallet(message, signature) == wallet.address
+    assert recover_wallet(message, "0x" + signature) == wallet.address
+    assert recover_wallet(message + "x", signature) != wallet.address
+    for bad in ("", "zz", "00" * 65, "ab" * 64, None):
+        with pytest.raises(SignatureValidationError):
+            recover_wallet(message, bad)
+
+
+@pytest.mark.asyncio
+async def test_wallet_by_signed_local():
+    wallet = Account.create()
+    recovery = LocalSignatureRecovery(cache_size=2)
+    tia = ServerIntegrationClient(signature_recovery=recovery)  # no session, the API server is never queried
+    messages = ["Test proof\nId: %d" % i for i in range(3)]
+    for message in messages:
+        assert await tia.wallet_by_signed(message, _sign(wallet, message)) == wallet.address
+    assert len(recovery.cache) == 2
+    assert await tia.wallet_by_signed(messages[-1], _sign(wallet, messages[-1])) == wallet.address
+    assert recovery.cache.hits == 1
+    with pytest.raises(SignatureValidationError):
+        await tia.wallet_by_signed(messages[0], "00" * 65)
+    assert len(recovery.cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_verify_many():
+    wallet = Account.create()
+    messages = ["Test proof\nId: %d" % i for i in range(5)]
+    pairs = [(message, _sign(wallet, message)) for message in messages]
+    pairs[2] = (messages[2], "00" * 65)
+    with ProcessPoolExecutor(2) as executor:
+        tia = ServerIntegrationClient(signature_recovery=LocalSignatureRecovery(executor=executor, chunk_size=2))
+        results = await tia.verify_many(pairs)
+    assert results[:2] == [wallet.address] * 2
+    assert isinstance(results[2], SignatureValidationError)
+    assert results[3:] == [wallet.address] * 2
+    assert len(tia.signature_recovery.cache) == 4
+    assert await tia.verify_many([]) == []
+
+
+@pytest.mark.asyncio
+async def test_verify_many_default():
+    wallet = Account.create()
+    pairs = [("Test proof\nId: %d" % i, _sign(wallet, "Test proof\nId: %d" % i)) for i in range(3)]
+    tia = ServerIntegrationClient()
+    await tia.setup()
+    try:
+        assert await tia.verify_many(pairs) == [wallet.address] * 3
+        assert await tia.verify_many(pairs[:1]) == [wallet.address]  # the same recovery and cache are used
+        assert tia._default_recovery.cache.hits == 1
+    finally:
+        await tia.close()
+    assert tia._default_recovery is None
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from encrypticoin_ssi.error import CircuitOpenError, IntegrationError, SignatureValidationError
+from encrypticoin_ssi.resilience import CircuitBreaker, HedgePolicy, LatencyTracker, ResiliencePolicy
+
+
+def test_latency_tracker():
+    tracker = LatencyTracker(size=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i)
+    assert tracker.percentile(0.5) is None
+    for i in range(200):
+        tracker.record(i / 100)
+    assert tracker.percentile(0.5) == 1.5 and tracker.percentile(0.99) == 1.99 and tracker.percentile(1) == 1.99
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.on_failure()
+    assert breaker.allow()
+    breaker.on_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    time.sleep(0.05)
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # a single probe
+    breaker.on_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.05)
+    assert breaker.allow()
+    breaker.on_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_hedged_wallet_by_signed(fake_tia, fake_client):
+    hedge = HedgePolicy(initial_delay=0.05)
+    fake_client.resilience = ResiliencePolicy(hedge)
+    fake_tia.delays = [2.0, 0]
+    started = time.monotonic()
+    assert await fake_client.wallet_by_signed("message", "signature") == fake_tia.signer
+    assert time.monotonic() - started < 1.0
+    assert fake_tia.requests == ["wallet-by-signed", "wallet-by-signed"]
+    # Both attempts are recorded, the abandoned one with at least the hedge delay.
+    assert len(hedge.latencies.samples) == 2 and max(hedge.latencies.samples) >= 0.05
+
+    fake_tia.statuses = [500]
+    assert await fake_client.wallet_by_signed("message", "signature") == fake_tia.signer  # retried by the hedge
+    with pytest.raises(SignatureValidationError):
+        await fake_client.wallet_by_signed("message", "invalid")
+    assert fake_tia.requests.count("wallet-by-signed") == 5
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_wallet_by_signed(fake_tia, fake_client):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    fake_client.resilience = ResiliencePolicy(breaker=breaker)
+    fake_tia.statuses = [500, 500]
+    for _ in range(2):
+        with pytest.raises(IntegrationError):
+            await fake_client.wallet_by_signed("message", "signature")
+    with pytest.raises(CircuitOpenError):
+        await fake_client.wallet_by_signed("message", "signature")
+    assert len(fake_tia.requests) == 2
+    time.sleep(0.05)
+    assert await fake_client.wallet_by_signed("message", "signature") == fake_tia.signer
+    assert breaker.state == CircuitBreaker.CLOSED
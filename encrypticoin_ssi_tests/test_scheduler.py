@@ -0,0 +1,53 @@
+import pytest
+
+from encrypticoin_ssi.error import BackoffError, IntegrationError
+from encrypticoin_ssi.scheduler import ExponentialBackoff, PollScheduler
+
+
+def test_exponential_backoff():
+    backoff = ExponentialBackoff(base=1.0, maximum=8.0)
+    for step in (1, 2, 4, 8, 8):
+        assert step / 2 <= backoff.next_delay() <= step
+    assert backoff.next_delay(retry_after=30) == 30
+    backoff.reset()
+    assert backoff.next_delay() <= 1
+
+
+def test_poll_scheduler():
+    scheduler = PollScheduler(idle_interval=4.0, min_interval=0.5, backoff=ExponentialBackoff(maximum=2.0))
+    assert scheduler.on_page(100) == 0  # page size learned, catching up
+    assert scheduler.on_page(100) == 0
+    assert scheduler.lag > 0
+    assert scheduler.on_page(20) == 0.5  # caught up
+    assert scheduler.lag == 0
+    assert [scheduler.on_page(0) for _ in range(5)] == [1.0, 2.0, 4.0, 4.0, 4.0]
+    assert scheduler.on_page(1) == 0.5
+    assert scheduler.on_backoff(retry_after=3) == 3
+    assert 0.5 <= scheduler.on_error() <= 2.0
+    assert scheduler.page_size == 100
+    assert scheduler.on_page(100) == 0
+    assert scheduler.lag >= 0
+
+    # Small pages are not learned as the page size.
+    scheduler = PollScheduler(min_interval=0.5)
+    assert scheduler.on_page(1) == 0.5
+    assert scheduler.on_page(1) == 0.5
+    assert scheduler.page_size is None
+    assert scheduler.on_page(50) == 0
+    assert scheduler.on_page(1) == 0.5
+    assert PollScheduler(page_size=3).on_page(3) == 0  # a configured page size is honored
+
+
+@pytest.mark.asyncio
+async def test_backoff_retry_after(fake_tia, fake_client):
+    fake_tia.statuses = [429, 429, 500]
+    with pytest.raises(BackoffError) as exc_info:
+        await fake_client.token_changes(0, 1)
+    assert exc_info.value.retry_after is None
+    fake_tia.retry_after = "7"
+    with pytest.raises(BackoffError) as exc_info:
+        await fake_client.token_changes(0, 1)
+    assert exc_info.value.retry_after == 7
+    with pytest.raises(IntegrationError):
+        await fake_client.token_changes(0, 1)
+    assert await fake_client.token_changes(0, 1) == []
@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+
+import pytest
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.collector import TokenChangeCollector
+from encrypticoin_ssi.shared_snapshot import SnapshotReader, SnapshotWriter
+from encrypticoin_ssi.storage import SQLiteChangeStorage
+
+
+def _address() -> str:
+    return "0x" + os.urandom(20).hex()
+
+
+def _read_in_process(path: str, addresses, results):
+    reader = SnapshotReader(path)
+    results.put([reader.get(address) for address in addresses])
+    reader.close()
+
+
+def _read_until_stopped(path: str, addresses, stop, results):
+    reader = SnapshotReader(path)
+    missing = lookups = 0
+    results.put("started")
+    try:
+        while not stop.is_set():
+            for address in addresses:
+                missing += reader.get(address) is None
+                lookups += 1
+    except TimeoutError as e:
+        results.put(repr(e))
+    else:
+        results.put((missing, lookups))
+    reader.close()
+
+
+def test_snapshot_writer_reader(tmp_path):
+    path = str(tmp_path / "balances.snapshot")
+    writer = SnapshotWriter(path, capacity=8, decimals=2)
+    reader = SnapshotReader(path)
+    addresses = [_address() for _ in range(100)]
+    writer.apply([TokenBalanceChange(i, a, str(i * 50), 2) for i, a in enumerate(addresses[:5])], 7)
+    assert reader.get(addresses[1]) == 50 and reader.get(addresses[5]) is None
+    assert reader.has_attribution(addresses[2]) and not reader.has_attribution(addresses[1])
+    assert reader.get_balance(addresses[4]).as_integer() == 2
+    assert reader.checkpoint() == (5, 7) and len(reader) == 5
+
+    # The growth replaces the file, the reader follows it.
+    writer.apply([TokenBalanceChange(i, a, str(i), 2) for i, a in enumerate(addresses) if i], 7)
+    assert writer.capacity > 8
+    assert [reader.get(a) for a in addresses[1:]] == list(range(1, 100))
+    with pytest.raises(ValueError):
+        writer.apply([TokenBalanceChange(100, addresses[0], "1", 3)], 7)
+
+    results = multiprocessing.get_context("spawn").Queue()
+    process = multiprocessing.get_context("spawn").Process(target=_read_in_process, args=(path, addresses[:3], results))
+    process.start()
+    assert results.get(timeout=30) == [None, 1, 2]
+    process.join()
+
+    writer.reset(8)
+    assert reader.get(addresses[1]) is None and reader.checkpoint() == (0, 8)
+    writer.close()
+
+    # An interrupted update is discarded when the file is reopened.
+    writer = SnapshotWriter(path, capacity=8, decimals=2)
+    writer.apply([TokenBalanceChange(0, addresses[0], "1", 2)], 8)
+    writer._begin()
+    writer.close()
+    writer = SnapshotWriter(path, capacity=8, decimals=2)
+    assert len(writer) == 0 and writer.checkpoint() == (0, None)
+    assert reader.get(addresses[0]) is None
+
+    # The readers do not wait forever for a writer that died in the middle of an update.
+    writer._begin()
+    stuck = SnapshotReader(path, timeout=0.05)
+    with pytest.raises(TimeoutError):
+        stuck.get(addresses[0])
+    stuck.close()
+    writer.close()
+
+    # A snapshot of another configuration is replaced, not truncated under the readers.
+    writer = SnapshotWriter(path, capacity=8, decimals=6)
+    assert reader.get(addresses[0]) is None and reader.decimals == 6
+    writer.close()
+    reader.close()
+
+
+def test_snapshot_load_concurrent_reader(tmp_path):
+    addresses = [_address() for _ in range(5000)]
+    storages = []
+    for session in (1, 2):
+        storage = SQLiteChangeStorage(str(tmp_path / ("tracking-%d.sqlite3" % session)))
+        storage.apply_changes([TokenBalanceChange(i, a, str(session), 2) for i, a in enumerate(addresses)], session)
+        storages.append(storage)
+    path = str(tmp_path / "balances.snapshot")
+    writer = SnapshotWriter(path, capacity=8, decimals=2)
+    writer.load(storages[0])
+
+    # The rebuilt snapshot is moved into place, the reader sees either the old or the new balances meanwhile.
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    results = context.Queue()
+    process = context.Process(target=_read_until_stopped, args=(path, addresses[::50], stop, results))
+    process.start()
+    assert results.get(timeout=30) == "started"
+    for storage in storages * 5:
+        writer.load(storage)
+    stop.set()
+    missing, lookups = results.get(timeout=30)
+    process.join()
+    assert missing == 0 and lookups > 0
+    reader = SnapshotReader(path)
+    writer.reset(3)
+    assert len(writer) == 0 and reader.checkpoint() == (0, 3) and reader.get(addresses[0]) is None
+    reader.close()
+    writer.close()
+    for storage in storages:
+        storage.close()
+
+
+@pytest.mark.asyncio
+async def test_collector_snapshot(fake_tia, fake_client, tmp_path):
+    addresses = [_address() for _ in range(4)]
+    for i, address in enumerate(addresses):
+        fake_tia.add_change(address, str(10**18 * i))
+    storage = SQLiteChangeStorage(str(tmp_path / "tracking.sqlite3"))
+    collector = TokenChangeCollector(fake_client, storage)
+    await collector.collect()
+    await collector.collect()
+
+    # The snapshot is built from the storage first, then updated by the collector.
+    writer = SnapshotWriter(str(tmp_path / "balances.snapshot"))
+    writer.load(storage)
+    collector.add_listener(writer)
+    reader = SnapshotReader(writer.path)
+    assert reader.checkpoint() == (4, 1) and reader.get(addresses[3]) == 3 * 10**18
+    assert [reader.has_attribution(a) for a in addresses] == [False, True, True, True]
+    fake_tia.add_change(addresses[0], str(10**18))
+    await collector.collect()
+    assert reader.checkpoint() == (5, 1) and reader.has_attribution(addresses[0])
+    reader.close()
+    writer.close()
+    storage.close()
@@ -0,0 +1,103 @@
+import os
+import random
+
+import pytest
+from eth_utils import to_checksum_address
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.collector import TokenChangeCollector
+from encrypticoin_ssi.snapshot_log import SnapshotLogStorage
+from encrypticoin_ssi.standin import StandInTIA
+from encrypticoin_ssi.storage import SQLiteChangeStorage
+from encrypticoin_ssi.tiers import Tier, TierTracker
+from encrypticoin_ssi.wallet_index import WalletBalanceIndex
+
+
+def _pages(count: int, size: int, since: int = 0):
+    rnd = random.Random(since)
+    addresses = [to_checksum_address("0x%040x" % i) for i in range(1, 50)]
+    pages = []
+    for _ in range(count):
+        pages.append(
+            [TokenBalanceChange(since + i, rnd.choice(addresses), str(rnd.randrange(3)), 18) for i in range(size)]
+        )
+        since += size
+    return pages
+
+
+def test_index_dump_restore():
+    index = WalletBalanceIndex(decimals=0)
+    for i in range(100):
+        index.set("0x%040x" % i, i)
+    restored = WalletBalanceIndex.restore(*index.dump(), decimals=0)
+    assert list(restored.items()) == list(index.items())
+    assert restored.attributed_count() == 99 and restored.get("0x%040x" % 42) == 42
+    with pytest.raises(ValueError):
+        WalletBalanceIndex.restore(b"\0" * 20, b"")
+
+
+def test_snapshot_log_storage(tmp_path):
+    directory = str(tmp_path / "tracking")
+    storage = SnapshotLogStorage(directory, snapshot_interval=25)
+    assert storage.load_checkpoint() == (0, None)
+    reference = {}
+    for changes in _pages(10, 4):
+        storage.apply_changes(changes, 1)
+        for change in changes:
+            reference[change.address] = int(change.balance)
+    reference = {address: balance for address, balance in reference.items() if balance}
+    assert dict(storage.balances()) == reference
+    storage.close()
+    assert os.path.getsize(storage.log_path) < 25 * 61  # the log was restarted after the snapshot
+
+    # An incomplete page at the end of the log is discarded.
+    with open(storage.log_path, "ab") as f:
+        f.write(b"\0" * 70)
+    storage = SnapshotLogStorage(directory, snapshot_interval=25)
+    assert storage.load_checkpoint() == (40, 1)
+    assert dict(storage.balances()) == reference
+    address, balance = next(iter(reference.items()))
+    assert storage.get_balance(address).balance == str(balance)
+    storage.apply_changes(_pages(1, 2, 40)[0], 1)
+    storage.close()
+    storage = SnapshotLogStorage(directory)
+    assert storage.load_checkpoint() == (42, 1)
+
+    storage.reset(2)
+    storage.close()
+    storage = SnapshotLogStorage(directory)
+    assert storage.load_checkpoint() == (0, 2) and list(storage.balances()) == []
+    storage.close()
+
+
+def test_storage_balances_format(tmp_path):
+    tia = StandInTIA(changes=200, wallets=20)
+    changes = [TokenBalanceChange(c["id"], c["address"], c["balance"], 18) for c in map(tia.change, range(200))]
+    latest = {c.address: c for c in changes}
+    expected = {}
+    for storage in (SQLiteChangeStorage(str(tmp_path / "tracking.db")), SnapshotLogStorage(str(tmp_path / "tracking"))):
+        storage.apply_changes(changes, 1)
+        balances = {address: balance for address, balance in storage.balances() if balance}  # SQLite keeps zeros
+        storage.close()
+        assert balances == (expected or balances)
+        expected = balances
+        # The persisted tiers continue with the changes of the API, the same balances have no transitions.
+        tracker = TierTracker([Tier("holder", 10**18)])
+        tracker.load(balances.items())
+        assert len(tracker) and tracker.process(latest.values()) == []
+    assert set(expected) == {address for address, change in latest.items() if int(change.balance)}
+
+
+@pytest.mark.asyncio
+async def test_collector_snapshot_log(fake_tia, fake_client, tmp_path):
+    for i in range(5):
+        fake_tia.add_change("0x%040x" % i, str(i))
+    storage = SnapshotLogStorage(str(tmp_path / "tracking"))
+    collector = TokenChangeCollector(fake_client, storage)
+    await collector.collect()
+    await collector.collect()
+    storage.close()
+    storage = SnapshotLogStorage(str(tmp_path / "tracking"))
+    assert storage.load_checkpoint() == (5, 1)
+    assert storage.get_balance("0x%040x" % 4).balance == "4"
+    storage.close()
@@ -0,0 +1,71 @@
+import pytest
+from aiohttp.test_utils import TestServer
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from eth_utils import is_checksum_address
+
+from encrypticoin_ssi.client import ServerIntegrationClient
+from encrypticoin_ssi.collector import TokenChangeCollector
+from encrypticoin_ssi.error import BackoffError, SignatureValidationError
+from encrypticoin_ssi.snapshot_log import SnapshotLogStorage
+from encrypticoin_ssi.standin import StandInTIA, fixed_latency
+
+
+@pytest.fixture
+async def standin():
+    tia = StandInTIA(changes=2500, wallets=50, page_size=1000, latency=fixed_latency(0.001))
+    server = TestServer(tia.create_app())
+    await server.start_server()
+    client = ServerIntegrationClient(domain="%s:%d" % (server.host, server.port), scheme="http")
+    await client.setup()
+    try:
+        yield tia, client
+    finally:
+        await client.close()
+        await server.close()
+
+
+def test_standin_stream():
+    tia = StandInTIA(changes=100, wallets=10, seed=3)
+    assert tia.change(42) == StandInTIA(changes=0, wallets=10, seed=3).change(42)
+    assert tia.change(42) != StandInTIA(wallets=10, seed=4).change(42)
+    assert len({tia.change(i)["address"] for i in range(100)}) <= 10
+    assert all(is_checksum_address(tia.change(i)["address"]) for i in range(10))
+    last = [c for c in map(tia.change, range(100)) if c["address"] == tia.change(99)["address"]][-1]
+    assert tia.balance(last["address"].upper().replace("0X", "0x")) == last["balance"]
+
+
+@pytest.mark.asyncio
+async def test_standin_client(standin, tmp_path):
+    tia, client = standin
+    storage = SnapshotLogStorage(str(tmp_path / "tracking"))
+    collector = TokenChangeCollector(client, storage)
+    while len(await collector.collect()) == 1000:
+        pass
+    assert storage.load_checkpoint() == (2500, 1)
+    assert dict(storage.balances()) == {a: int(b) for a, b in ((a, tia.balance(a)) for a, _ in storage.balances())}
+    assert tia._indexed == 2500  # indexed in the background
+    address = next(storage.balances())[0]
+    assert (await client.token_balance(address)).balance == tia.balance(address)
+    assert (await client.contract_info())["decimals"] == 18
+
+    tia.reset_session()
+    tia.changes += 10
+    last = tia.change(2509)
+    assert (await client.token_balance(last["address"])).balance == last["balance"]  # the new changes are indexed
+    assert tia._indexed == 2510
+    await collector.collect()
+    assert storage.load_checkpoint() == (1000, 2)
+    storage.close()
+
+    wallet = Account.create()
+    signature = wallet.sign_message(encode_defunct(text="message")).signature.hex()
+    assert await client.wallet_by_signed("message", signature) == wallet.address
+    with pytest.raises(SignatureValidationError):
+        await client.wallet_by_signed("message", "00")
+
+    tia.rate_limit_ratio = 1.0
+    with pytest.raises(BackoffError) as e:
+        await client.contract_info()
+    assert e.value.retry_after == 1.0
+    assert tia.requests["token-changes"] == 6  # including the two that detected a session change
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from encrypticoin_ssi.error import IntegrationError, TrackingSessionReset
+from encrypticoin_ssi.stream import ChangesStreamParser
+
+
+def _parse(*pieces: str):
+    parser = ChangesStreamParser()
+    items = []
+    for piece in pieces:
+        items.extend(parser.feed(piece))
+    items.extend(parser.close())
+    return parser.header, items
+
+
+def test_stream_parser():
+    changes = [{"id": i, "address": "0xA%d" % i, "balance": str(10**i)} for i in range(4)]
+    for result in (
+        {"session": 5, "decimals": 18, "changes": changes},
+        {"changes": changes[:1], "session": None, "decimals": 18, "extra": [{"a": "b}"}, 1.5e3, True]},
+        {"changes": [], "decimals": 18},
+        {},
+    ):
+        text = json.dumps(result, indent=1)
+        header = dict(result)
+        expected = header.pop("changes", [])
+        for cut in range(len(text) + 1):
+            assert _parse(text[:cut], text[cut:]) == (header, expected)
+        assert _parse(*text) == (header, expected)
+    for malformed in ('{"changes": [1,]}', '{"a": 1', "[]", '{"a" 1}', '{"changes": [1 2]}', '{"a": 1}x', ""):
+        with pytest.raises(ValueError):
+            _parse(malformed)
+
+
+@pytest.mark.asyncio
+async def test_iter_token_changes(fake_tia, fake_client):
+    fake_tia.page_size = 100
+    for i in range(50):
+        fake_tia.add_change("0xA%d" % i, str(i))
+    changes = [c async for c in fake_client.iter_token_changes(10, 1, chunk_size=7)]
+    assert [c.id for c in changes] == list(range(10, 50))
+    assert changes[-1].balance == "49" and changes[-1].decimals == 18
+    with pytest.raises(TrackingSessionReset):
+        async for _ in fake_client.iter_token_changes(0, None, chunk_size=7):
+            assert False
+    fake_tia.changes_body = '{"changes": [{"id": 0, "address": "0xA0", "balance": "1"}], "decimals": 18}'
+    assert [c.id async for c in fake_client.iter_token_changes(0, None)] == [0]
+    for body in ('{"session": 1, "decimals": 18, "changes": [{"id": 0}]}', '{"session": 1, "changes": [', "[]"):
+        fake_tia.changes_body = body
+        with pytest.raises(IntegrationError):
+            async for _ in fake_client.iter_token_changes(0, 1):
+                pass
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from encrypticoin_ssi.error import BackoffError, SignatureValidationError, TrackingSessionReset
+from encrypticoin_ssi.standin import StandInTIA
+from encrypticoin_ssi.sync_client import SyncServerIntegrationClient
+
+
+@pytest.fixture
+def standin_thread():
+    """
+    The stand-in server runs in a thread, as the synchronous client blocks the calling thread.
+    """
+    tia = StandInTIA(changes=25, wallets=5, page_size=10)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(tia.create_app())
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        yield tia, port
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+
+def test_sync_client(standin_thread):
+    tia, port = standin_thread
+    client = SyncServerIntegrationClient(domain="127.0.0.1:%d" % port, scheme="http", pool_size=4)
+    try:
+        assert client.contract_info()["decimals"] == 18
+        with pytest.raises(TrackingSessionReset):
+            client.token_changes(0)
+        changes = client.token_changes(20, 1)
+        assert [c.id for c in changes] == [20, 21, 22, 23, 24]
+        assert client.token_changes_batch(10, 1).last_id == 19
+        address = changes[-1].address
+        assert client.token_balance(address).balance == changes[-1].balance
+
+        wallet = Account.create()
+        signature = wallet.sign_message(encode_defunct(text="message")).signature.hex()
+        assert client.wallet_by_signed("message", signature) == wallet.address
+        with pytest.raises(SignatureValidationError):
+            client.wallet_by_signed("message", "00")
+
+        # The concurrent calls share the pooled keep-alive connections.
+        with ThreadPoolExecutor(8) as executor:
+            balances = list(executor.map(lambda _: client.token_balance(address).balance, range(100)))
+        assert balances == [changes[-1].balance] * 100
+        assert client.connections_created <= 4
+
+        tia.rate_limit_ratio = 1.0
+        tia.retry_after = 3
+        with pytest.raises(BackoffError) as e:
+            client.contract_info()
+        assert e.value.retry_after == 3
+    finally:
+        client.close()
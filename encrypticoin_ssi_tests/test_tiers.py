@@ -0,0 +1,42 @@
+import pytest
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.tiers import Tier, TierTracker, TierTransition
+
+
+def test_tier_tracker():
+    bronze, silver, gold = Tier("bronze", 10), Tier("silver", 100), Tier("gold", 1000)
+    tracker = TierTracker([gold, bronze, silver])
+    assert tracker.tiers == [bronze, silver, gold]
+    assert tracker.tier_for(9) is None
+    assert tracker.tier_for(100) is silver
+    balances = [("0xA", 5), ("0xA", 10), ("0xA", 50), ("0xB", 2000), ("0xA", 150), ("0xB", 999), ("0xA", 0), ("0xC", 1)]
+    changes = [TokenBalanceChange(i, a, str(b), 0) for i, (a, b) in enumerate(balances)]
+    transitions = tracker.process(changes)
+    assert [(t.kind, t.address, t.old_tier, t.new_tier, t.change.id) for t in transitions] == [
+        (TierTransition.GRANT, "0xA", None, bronze, 1),
+        (TierTransition.GRANT, "0xB", None, gold, 3),
+        (TierTransition.UPGRADE, "0xA", bronze, silver, 4),
+        (TierTransition.DOWNGRADE, "0xB", gold, silver, 5),
+        (TierTransition.REVOKE, "0xA", silver, None, 6),
+    ]
+    assert len(tracker) == 1
+    assert tracker.current("0xB") is silver
+    assert tracker.current("0xA") is None
+    assert [(t.kind, t.address, t.old_tier) for t in tracker.reset()] == [(TierTransition.REVOKE, "0xB", silver)]
+    assert len(tracker) == 0
+
+    # Continue from persisted balances, e.g. after a restart from a checkpoint.
+    tracker.load([("0xA", 150), ("0xB", 5), ("0xC", 1000)])
+    assert len(tracker) == 2
+    changes = [TokenBalanceChange(i, a, str(b), 0) for i, (a, b) in enumerate([("0xA", 0), ("0xC", 100)])]
+    assert [(t.kind, t.address, t.old_tier) for t in tracker.process(changes)] == [
+        (TierTransition.REVOKE, "0xA", silver),
+        (TierTransition.DOWNGRADE, "0xC", gold),
+    ]
+
+
+def test_tier_tracker_invalid():
+    for tiers in ([], [Tier("a", 0)], [Tier("a", 5), Tier("b", 5)]):
+        with pytest.raises(ValueError):
+            TierTracker(tiers)
@@ -0,0 +1,61 @@
+import os
+import random
+
+import pytest
+
+from encrypticoin_ssi.balance_change import TokenBalanceChange
+from encrypticoin_ssi.wallet_index import WalletBalanceIndex, address_key
+
+
+def _address() -> str:
+    return "0x" + os.urandom(20).hex()
+
+
+def test_address_key():
+    address = "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"
+    assert address_key(address) == bytes.fromhex(address[2:])
+    for invalid in ("", "0x12", address[2:] + "00", "0x" + "zz" * 20):
+        with pytest.raises(ValueError):
+            address_key(invalid)
+
+
+def test_wallet_balance_index():
+    index = WalletBalanceIndex(decimals=2)
+    reference = {}
+    addresses = [_address() for _ in range(3000)]
+    rnd = random.Random(1)
+    for _ in range(20000):
+        address = rnd.choice(addresses)
+        if rnd.random() < 0.3:
+            assert index.remove(address) == (reference.pop(address, None) is not None)
+        else:
+            reference[address] = rnd.randrange(0, 300)
+            index.set(address, reference[address])
+    assert len(index) == len(reference)
+    for address in addresses:
+        assert index.get(address) == reference.get(address)
+        assert (address in index) == (address in reference)
+        assert index.has_attribution(address) == (reference.get(address, 0) >= 100)
+    assert index.attributed_count() == sum(1 for v in reference.values() if v >= 100)
+    assert dict(index.items()) == {address_key(a): v for a, v in reference.items()}
+
+    for address in list(reference):
+        assert index.remove(address)
+    assert len(index) == 0 and index.attributed_count() == 0
+    assert not index.remove(addresses[0])
+
+
+def test_wallet_balance_index_apply():
+    index = WalletBalanceIndex(threshold=5 * 10**17)
+    a0, a1 = _address(), _address()
+    index.apply([TokenBalanceChange(0, a0, str(10**18), 18), TokenBalanceChange(1, a1, "1", 18)])
+    assert index.get_balance(a0).as_integer() == 1
+    assert index.has_attribution(a0) and not index.has_attribution(a1)
+    index.apply([TokenBalanceChange(2, a0, "0", 18)])
+    assert a0 not in index and len(index) == 1
+    index.set(a1, 2**256 - 1)
+    assert index.get(a1) == 2**256 - 1
+    with pytest.raises(OverflowError):
+        index.set(a1, 2**256)
+    with pytest.raises(ValueError):
+        index.apply([TokenBalanceChange(3, a0, "1", 6)])
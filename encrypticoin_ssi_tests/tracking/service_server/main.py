@@ -1,6 +1,5 @@
 import asyncio
 import os
-import time
 
 import aiohttp
 from starlette.applications import Starlette
@@ -12,11 +11,25 @@ from starlette.responses import JSONResponse
 from starlette.routing import Route
 
 from encrypticoin_ssi.client import ServerIntegrationClient
-from encrypticoin_ssi.error import BackoffError, IntegrationError, SignatureValidationError, TrackingSessionReset
+from encrypticoin_ssi.error import (
+    BackoffError,
+    ChallengeError,
+    ChallengeExpired,
+    IntegrationError,
+    SignatureValidationError,
+    TrackingSessionReset,
+)
 from encrypticoin_ssi.message import ProofMessageFactory
 
-tia = ServerIntegrationClient()
-msg_factory = ProofMessageFactory("Wallet ownership proof for token attribution at TrackingTest web-shop.")
+# NOTE: The API server may be overridden for offline testing, e.g. with the `encrypticoin_ssi.standin` server.
+tia = ServerIntegrationClient(
+    domain=os.environ.get("TIA_DOMAIN", "etalon.cash"), scheme=os.environ.get("TIA_SCHEME", "https")
+)
+# NOTE: The challenge key shall be shared by the server processes, and kept secret.
+msg_factory = ProofMessageFactory(
+    "Wallet ownership proof for token attribution at TrackingTest web-shop.",
+    secret_key=bytes.fromhex(os.environ["CHALLENGE_KEY"]) if "CHALLENGE_KEY" in os.environ else os.urandom(32),
+)
 collector_task: asyncio.Task = None
 # NOTE: The wallet balances shall be saved and recalled from a persistent storage in a production system.
 wallet_balances = dict()
@@ -74,10 +87,10 @@ async def _collector():
 
 
 def wallet_challenge(request: Request):
-    # NOTE: The message_id value is protected in the server-side session storage from manipulation, we only need
-    # to include a timestamp and make the value unique.
-    message_id = "-".join([str(time.time()), os.urandom(16).hex()])
-    request.session["message_id"] = message_id
+    # NOTE: The message_id is signed by the server and bound to the session of the user, so it needs no server-side
+    # storage: the service-client submits the message back with the signature.
+    binding = request.session.setdefault("binding", os.urandom(16).hex())
+    message_id = msg_factory.create_challenge(binding, ttl=5)
     return JSONResponse({"message": msg_factory.create(message_id)})
 
 
@@ -85,12 +98,15 @@ async def submit_signature(request: Request):
     params = await request.json()
     if not isinstance(params, dict) or not isinstance(params.get("signature"), str):
         raise HTTPException(400, "signature missing")
-    try:
-        message_id = request.session.pop("message_id")
-    except KeyError:
+    message_id = msg_factory.extract_id(params["message"]) if isinstance(params.get("message"), str) else None
+    if message_id is None or "binding" not in request.session:
         raise HTTPException(400, "no message_id set up")
-    if float(message_id.partition("-")[0]) + 5 < time.time():
+    try:
+        msg_factory.verify_challenge(message_id, request.session["binding"])
+    except ChallengeExpired:
         raise HTTPException(400, "message_id expired")
+    except ChallengeError:
+        raise HTTPException(400, "message_id invalid")
     try:
         address = await tia.wallet_by_signed(msg_factory.create(message_id), params["signature"])
     except SignatureValidationError:
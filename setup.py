@@ -12,7 +12,7 @@ with open(os.path.join(HERE, "README.md"), encoding="utf-8") as f:
 
 requirements = defaultdict(list)
 for name in os.listdir(os.path.join(HERE, "requirements")):
-    if name not in ("base.in", "test.in"):
+    if name not in ("base.in", "test.in", "recovery.in", "fast.in"):
         continue
     reqs = requirements[name.rpartition(".")[0]]
     with open(os.path.join(HERE, "requirements", name)) as f: